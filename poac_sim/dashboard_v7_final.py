@@ -74,14 +74,38 @@ def load_productivity_data():
     
     return df[['Blok_Prod', 'Divisi_Prod', 'Luas_Ha', 'Produksi_Ton', 'Yield_TonHa']].dropna()
 
-def get_hex_neighbors(baris, pokok):
-    """Get hexagonal neighbors (mata lima pattern)."""
-    if baris % 2 == 0:
-        return [(baris-1, pokok-1), (baris-1, pokok), (baris, pokok-1), 
-                (baris, pokok+1), (baris+1, pokok-1), (baris+1, pokok)]
-    else:
-        return [(baris-1, pokok), (baris-1, pokok+1), (baris, pokok-1),
-                (baris, pokok+1), (baris+1, pokok), (baris+1, pokok+1)]
+# Offset tetangga hexagonal (mata lima) dalam koordinat axial (d_r, d_q).
+# Dengan r = N_BARIS dan q = N_POKOK + (N_BARIS + 1) // 2, keenam tetangga
+# punya offset tetap untuk baris genap maupun ganjil (tanpa cabang paritas).
+HEX_AXIAL_OFFSETS = np.array([(-1, -1), (-1, 0), (0, -1), (0, 1), (1, 0), (1, 1)])
+
+def to_axial(baris, pokok):
+    """Konversi (N_BARIS, N_POKOK) offset-row ke koordinat axial (r, q)."""
+    return baris, pokok + (baris + 1) // 2
+
+def build_hex_neighbor_index(df):
+    """
+    Build tabel tetangga hexagonal (N, 6) berisi posisi baris df (-1 = kosong).
+    Tiap blok di-bucket ke grid 2D padat axial (r, q) -> posisi, sehingga
+    tetangga cukup dibaca langsung dari grid tanpa hash lookup.
+    """
+    n = len(df)
+    r_all, q_all = to_axial(df['N_BARIS'].to_numpy().astype(np.int64),
+                            df['N_POKOK'].to_numpy().astype(np.int64))
+    neighbor_idx = np.full((n, 6), -1, dtype=np.int32)
+    
+    for rows in df.groupby('Blok', sort=False).indices.values():
+        r = r_all[rows]
+        q = q_all[rows]
+        r0, q0 = r.min() - 1, q.min() - 1  # padding 1 sel agar tetangga selalu di dalam grid
+        grid = np.full((r.max() - r0 + 2, q.max() - q0 + 2), -1, dtype=np.int32)
+        # Koordinat duplikat: posisi terakhir yang dipakai (sama seperti dict lookup lama)
+        np.maximum.at(grid, (r - r0, q - q0), rows.astype(np.int32))
+        
+        neighbor_idx[rows] = grid[r[:, None] + HEX_AXIAL_OFFSETS[:, 0] - r0,
+                                  q[:, None] + HEX_AXIAL_OFFSETS[:, 1] - q0]
+    
+    return neighbor_idx
 
 def hybrid_cincin_api_zscore(df, z_core=-1.5, z_neighbor=-0.5, min_neighbors=2):
     """
@@ -91,72 +115,38 @@ def hybrid_cincin_api_zscore(df, z_core=-1.5, z_neighbor=-0.5, min_neighbors=2):
     Step 2: Apply Cincin Api logic to classify MERAH clusters
     Step 3: Create ORANYE ring around MERAH trees
     """
-    df = df.copy()
-    
-    # Step 1: Calculate Z-Score per block
-    block_stats = df.groupby('Blok')['NDRE125'].agg(['mean', 'std']).reset_index()
-    block_stats.columns = ['Blok', 'Mean_NDRE', 'SD_NDRE']
-    block_stats['SD_NDRE'] = block_stats['SD_NDRE'].fillna(1).replace(0, 1)
+    df = df.reset_index(drop=True)
     
-    df = df.merge(block_stats, on='Blok', how='left')
+    # Step 1: Calculate Z-Score per block (vectorized transform, tanpa merge)
+    grp = df.groupby('Blok')['NDRE125']
+    df['Mean_NDRE'] = grp.transform('mean')
+    df['SD_NDRE'] = grp.transform('std').fillna(1).replace(0, 1)
     df['ZScore'] = (df['NDRE125'] - df['Mean_NDRE']) / df['SD_NDRE']
     
-    # Step 2: Build coordinate lookup
-    coord_lookup = {}
-    for idx, row in df.iterrows():
-        key = (row['Blok'], int(row['N_BARIS']), int(row['N_POKOK']))
-        coord_lookup[key] = idx
+    # Step 2: Build neighbor adjacency
+    neighbor_idx = build_hex_neighbor_index(df)
+    has_neighbor = neighbor_idx >= 0
     
     # Step 3: Initialize - mark suspects using Z-Score
-    df['Status_Risiko'] = 'HIJAU'
-    df['Jumlah_Tetangga_Sakit'] = 0
-    df['Is_Cincin_Api'] = False
-    
-    suspect_mask = df['ZScore'] < z_core
-    suspect_indices = df[suspect_mask].index.tolist()
+    zscore = df['ZScore'].to_numpy()
+    suspect = zscore < z_core
     
     # Step 4: Count sick neighbors for suspects (Cincin Api TAHAP 1)
-    for idx in suspect_indices:
-        row = df.loc[idx]
-        blok = row['Blok']
-        baris = int(row['N_BARIS'])
-        pokok = int(row['N_POKOK'])
-        
-        neighbors = get_hex_neighbors(baris, pokok)
-        sick_count = 0
-        
-        for n_baris, n_pokok in neighbors:
-            neighbor_key = (blok, n_baris, n_pokok)
-            if neighbor_key in coord_lookup:
-                n_idx = coord_lookup[neighbor_key]
-                if df.loc[n_idx, 'ZScore'] < z_neighbor:
-                    sick_count += 1
-        
-        df.loc[idx, 'Jumlah_Tetangga_Sakit'] = sick_count
-        
-        if sick_count >= min_neighbors:
-            df.loc[idx, 'Status_Risiko'] = 'MERAH'
-        else:
-            df.loc[idx, 'Status_Risiko'] = 'KUNING'
+    sick_neighbor = has_neighbor & (zscore[np.where(has_neighbor, neighbor_idx, 0)] < z_neighbor)
+    sick_count = np.where(suspect, sick_neighbor.sum(axis=1), 0)
+    merah = suspect & (sick_count >= min_neighbors)
     
     # Step 5: Create Cincin Api (TAHAP 2) - neighbors of MERAH become ORANYE
-    merah_indices = df[df['Status_Risiko'] == 'MERAH'].index.tolist()
+    ring_idx = neighbor_idx[merah].ravel()
+    cincin = np.zeros(len(df), dtype=bool)
+    cincin[ring_idx[ring_idx >= 0]] = True
+    cincin &= ~merah
     
-    for idx in merah_indices:
-        row = df.loc[idx]
-        blok = row['Blok']
-        baris = int(row['N_BARIS'])
-        pokok = int(row['N_POKOK'])
-        
-        neighbors = get_hex_neighbors(baris, pokok)
-        
-        for n_baris, n_pokok in neighbors:
-            neighbor_key = (blok, n_baris, n_pokok)
-            if neighbor_key in coord_lookup:
-                n_idx = coord_lookup[neighbor_key]
-                if df.loc[n_idx, 'Status_Risiko'] != 'MERAH':
-                    df.loc[n_idx, 'Status_Risiko'] = 'ORANYE'
-                    df.loc[n_idx, 'Is_Cincin_Api'] = True
+    df['Status_Risiko'] = np.where(merah, 'MERAH',
+                          np.where(cincin, 'ORANYE',
+                          np.where(suspect, 'KUNING', 'HIJAU')))
+    df['Jumlah_Tetangga_Sakit'] = sick_count
+    df['Is_Cincin_Api'] = cincin
     
     return df
 
@@ -319,7 +309,7 @@ def convert_prod_to_gano_pattern(prod_blok):
 def generate_html_with_realtime(output_dir, all_results, all_maps, prod_df):
     """Generate HTML with real-time configuration panel and dual POV."""
     
-    presets_json = json.dumps(ZSCORE_PRESETS)
+    presets_json = json.dumps(ZSCORE_PRESETS, separators=(',', ':'))
     
     # Prepare data for JavaScript
     js_data = {}
@@ -328,15 +318,15 @@ def generate_html_with_realtime(output_dir, all_results, all_maps, prod_df):
         results = data['results']
         
         # Aggregate all trees from standar preset for JS recalculation
-        df_full = results['standar']['df']
+        df_full = results['standar']['df'].reset_index(drop=True)
         js_data[divisi_id] = {
-            'trees': df_full[['Blok', 'N_BARIS', 'N_POKOK', 'ZScore', 'Mean_NDRE', 'SD_NDRE']].to_dict('records'),
+            # Layout SoA: satu array per kolom, bukan satu object per pohon
+            'trees': {'ZScore': df_full['ZScore'].tolist()},
+            'neighbors': build_hex_neighbor_index(df_full).ravel().tolist(),
             'total_trees': len(df_full),
             'total_blocks': df_full['Blok'].nunique()
         }
     
-    js_data_json = json.dumps(js_data)
-    
     # Build tabs
     divisi_tabs = ""
     divisi_content = ""
@@ -373,32 +363,6 @@ def generate_html_with_realtime(output_dir, all_results, all_maps, prod_df):
                 for m in block_maps.get(p, [])
             ])
             maps_html += f'<div class="maps-section"><h4>{p.upper()}</h4><div class="maps-grid">{items}</div></div>'
-        
-def convert_gano_to_prod_pattern(gano_blok):
-    """
-    Convert Ganoderma block name to Productivity block pattern.
-    Examples: B16 → B016, A12 → A012, C18A → C018
-    """
-    import re
-    match = re.match(r'([A-Z]+)(\d+)([A-Z]*)', str(gano_blok))
-    if match:
-        prefix, num, suffix = match.groups()
-        # Zero-pad number to 3 digits
-        return f"{prefix}{num.zfill(3)}"
-    return str(gano_blok)
-
-def convert_prod_to_gano_pattern(prod_blok):
-    """
-    Convert Productivity block name to Ganoderma block pattern.
-    Examples: A012A → A12, B016B → B16, C018A → C18
-    """
-    import re
-    match = re.match(r'([A-Z]+)(\d+)([A-Z]*)', str(prod_blok))
-    if match:
-        prefix, num, suffix = match.groups()
-        # Remove leading zeros
-        return f"{prefix}{int(num)}"
-    return str(prod_blok)
 
         # POV 1: Ganoderma → Yield
         block_stats = results['standar']['block_stats']
@@ -456,7 +420,8 @@ def convert_prod_to_gano_pattern(prod_blok):
             </section>
         </div>'''
     
-    html = f'''<!DOCTYPE html>
+    # HTML ditulis bertahap: header, DIVISI_DATA (json.dump langsung ke file), footer
+    html_head = f'''<!DOCTYPE html>
 <html lang="id">
 <head>
     <meta charset="UTF-8">
@@ -665,9 +630,13 @@ tr:hover {{ background:rgba(255,255,255,0.05); }}
     </div>
     
     <script>
+'use strict';
 // Global data
 const PRESETS = {presets_json};
-const DIVISI_DATA = {js_data_json};
+const DIVISI_DATA = '''
+    
+    html_tail = f''';
+const NF = new Intl.NumberFormat();  // dipakai ulang, bukan toLocaleString() per update
 let currentDivisi = '{list(all_results.keys())[0].replace(" ", "_")}';
 
 // Preset management
@@ -704,89 +673,192 @@ function updateConfig() {{
     }}
     document.getElementById('preset-select').value = matchedPreset || 'custom';
     
-    // Recalculate for current divisi
-    recalculate(currentDivisi, zCore, zNeighbor, minNeighbors);
+    // Recalculate for current divisi (maksimal sekali per frame)
+    scheduleRecalculate();
 }}
 
-function recalculate(divisiId, zCore, zNeighbor, minNeighbors) {{
-    const data = DIVISI_DATA[divisiId];
-    if (!data) return;
-    
-    let merah = 0, oranye = 0, kuning = 0, hijau = 0;
-    const statusMap = new Map();
+// Slider bisa memicu puluhan event input per detik: gabungkan jadi satu hitung ulang per frame
+let pendingFrame = null;
+function scheduleRecalculate() {{
+    if (pendingFrame !== null) return;
+    pendingFrame = requestAnimationFrame(() => {{
+        pendingFrame = null;
+        recalculate(currentDivisi,
+            parseFloat(document.getElementById('z-core').value),
+            parseFloat(document.getElementById('z-neighbor').value),
+            parseInt(document.getElementById('min-neighbors').value));
+    }});
+}}
+
+// Kernel klasifikasi Cincin Api di atas typed array.
+// Dijalankan di WebWorker; di main thread hanya sebagai fallback.
+function classifyKernel(zscore, neighborIdx, zCore, zNeighbor, minNeighbors) {{
+    const n = zscore.length;
+    
+    // Pass 0: bandingkan ZScore dengan kedua threshold dalam satu sweep tanpa cabang
+    // (unroll 4). Hasilnya mask tetangga-stres 1 byte/pohon dan daftar suspect padat.
+    const weak = new Uint8Array(n);
+    const suspects = new Int32Array(n);
+    let nSuspect = 0;
+    let i = 0;
+    for (; i + 4 <= n; i += 4) {{
+        const z0 = zscore[i], z1 = zscore[i + 1], z2 = zscore[i + 2], z3 = zscore[i + 3];
+        weak[i] = z0 < zNeighbor;
+        weak[i + 1] = z1 < zNeighbor;
+        weak[i + 2] = z2 < zNeighbor;
+        weak[i + 3] = z3 < zNeighbor;
+        suspects[nSuspect] = i;     nSuspect += z0 < zCore;
+        suspects[nSuspect] = i + 1; nSuspect += z1 < zCore;
+        suspects[nSuspect] = i + 2; nSuspect += z2 < zCore;
+        suspects[nSuspect] = i + 3; nSuspect += z3 < zCore;
+    }}
+    for (; i < n; i++) {{
+        weak[i] = zscore[i] < zNeighbor;
+        suspects[nSuspect] = i; nSuspect += zscore[i] < zCore;
+    }}
     
-    // Step 1: Identify suspects and classify MERAH/KUNING
-    for (const tree of data.trees) {{
-        const key = `${{tree.Blok}}_${{tree.N_BARIS}}_${{tree.N_POKOK}}`;
+    let merah = 0, oranye = 0, kuning = 0, hijau = n - nSuspect;
+    // Status per pohon: 0=HIJAU, 1=KUNING, 2=MERAH, 3=ORANYE
+    const status = new Uint8Array(n);
+    const merahIdx = new Int32Array(nSuspect);
+    
+    // Step 1: Classify suspects MERAH/KUNING dari jumlah tetangga stres
+    for (let s = 0; s < nSuspect; s++) {{
+        const t = suspects[s];
+        const base = t * 6;
+        let sickNeighbors = 0;
+        for (let j = 0; j < 6; j++) {{
+            const k = neighborIdx[base + j];
+            if (k >= 0) sickNeighbors += weak[k];
+        }}
         
-        if (tree.ZScore < zCore) {{
-            // Count sick neighbors
-            let sickNeighbors = 0;
-            const neighbors = getHexNeighbors(tree.N_BARIS, tree.N_POKOK);
-            
-            for (const [nb, np] of neighbors) {{
-                const neighborKey = `${{tree.Blok}}_${{nb}}_${{np}}`;
-                const neighbor = data.trees.find(t => 
-                    t.Blok === tree.Blok && t.N_BARIS === nb && t.N_POKOK === np
-                );
-                if (neighbor && neighbor.ZScore < zNeighbor) {{
-                    sickNeighbors++;
-                }}
-            }}
-            
-            if (sickNeighbors >= minNeighbors) {{
-                statusMap.set(key, 'MERAH');
-                merah++;
-            }} else {{
-                statusMap.set(key, 'KUNING');
-                kuning++;
-            }}
+        if (sickNeighbors >= minNeighbors) {{
+            status[t] = 2;
+            merahIdx[merah++] = t;
         }} else {{
-            statusMap.set(key, 'HIJAU');
-            hijau++;
+            status[t] = 1;
+            kuning++;
         }}
     }}
     
-    // Step 2: Create Cincin Api (ORANYE)
-    const merahKeys = [...statusMap.entries()].filter(([k, v]) => v === 'MERAH').map(([k]) => k);
-    
-    for (const merahKey of merahKeys) {{
-        const [blok, baris, pokok] = merahKey.split('_');
-        const neighbors = getHexNeighbors(parseInt(baris), parseInt(pokok));
-        
-        for (const [nb, np] of neighbors) {{
-            const neighborKey = `${{blok}}_${{nb}}_${{np}}`;
-            if (statusMap.has(neighborKey) && statusMap.get(neighborKey) !== 'MERAH') {{
-                const oldStatus = statusMap.get(neighborKey);
-                statusMap.set(neighborKey, 'ORANYE');
-                
-                // Update counts
-                if (oldStatus === 'HIJAU') hijau--;
-                else if (oldStatus === 'KUNING') kuning--;
+    // Step 2: Create Cincin Api (ORANYE) - hanya tetangga dari indeks MERAH
+    for (let m = 0; m < merah; m++) {{
+        const base = merahIdx[m] * 6;
+        for (let j = 0; j < 6; j++) {{
+            const k = neighborIdx[base + j];
+            if (k >= 0 && status[k] < 2) {{
+                if (status[k] === 0) hijau--;
+                else kuning--;
+                status[k] = 3;
                 oranye++;
             }}
         }}
     }}
     
-    // Update UI
-    document.getElementById(`merah-${{divisiId}}`).textContent = merah.toLocaleString();
-    document.getElementById(`oranye-${{divisiId}}`).textContent = oranye.toLocaleString();
-    document.getElementById(`kuning-${{divisiId}}`).textContent = kuning.toLocaleString();
-    document.getElementById(`hijau-${{divisiId}}`).textContent = hijau.toLocaleString();
+    return {{merah, oranye, kuning, hijau}};
+}}
+
+const WORKER_SRC = "'use strict';" + classifyKernel.toString() + `
+const DATA = {{}};
+self.onmessage = function(e) {{
+    const msg = e.data;
+    if (msg.type === 'init') {{
+        DATA[msg.divisiId] = {{zscore: new Float64Array(msg.zscore), neighborIdx: new Int32Array(msg.neighborIdx)}};
+        return;
+    }}
+    const d = DATA[msg.divisiId];
+    const counts = classifyKernel(d.zscore, d.neighborIdx, msg.zCore, msg.zNeighbor, msg.minNeighbors);
+    counts.divisiId = msg.divisiId;
+    counts.cacheKey = msg.cacheKey;
+    self.postMessage(counts);
+}};`;
+
+// Memo hasil per (divisi, zCore, zNeighbor, minNeighbors); LRU via urutan insert Map
+const RESULT_CACHE = new Map();
+const RESULT_CACHE_SIZE = 256;
+const latestKey = {{}};
+const latestParams = {{}};  // parameter permintaan terakhir per divisi (untuk fallback bila worker gagal)
+
+function cacheResult(key, counts) {{
+    RESULT_CACHE.delete(key);
+    RESULT_CACHE.set(key, counts);
+    if (RESULT_CACHE.size > RESULT_CACHE_SIZE) RESULT_CACHE.delete(RESULT_CACHE.keys().next().value);
+}}
+
+let worker = null;
+try {{
+    worker = new Worker(URL.createObjectURL(new Blob([WORKER_SRC], {{type: 'application/javascript'}})));
+    worker.onmessage = (e) => {{
+        const counts = e.data;
+        cacheResult(counts.cacheKey, counts);
+        // Abaikan hasil usang bila slider sudah berpindah ke konfigurasi lain
+        if (latestKey[counts.divisiId] === counts.cacheKey) renderCounts(counts.divisiId, counts);
+    }};
+    worker.onerror = (e) => {{
+        // Worker gagal: permintaan yang sedang jalan tidak akan dibalas, jadi hitung ulang
+        // konfigurasi terakhir tiap divisi di main thread agar panel tidak tertinggal
+        e.preventDefault();
+        worker.terminate();
+        worker = null;
+        for (const divisiId of Object.keys(DIVISI_DATA)) DIVISI_DATA[divisiId].workerReady = false;
+        for (const divisiId of Object.keys(latestKey)) {{
+            if (RESULT_CACHE.has(latestKey[divisiId])) continue;
+            const p = latestParams[divisiId];
+            computeOnMainThread(divisiId, p.zCore, p.zNeighbor, p.minNeighbors, latestKey[divisiId]);
+        }}
+    }};
+}} catch (err) {{
+    worker = null;  // Browser tanpa dukungan Worker: hitung di main thread
+}}
+
+function recalculate(divisiId, zCore, zNeighbor, minNeighbors) {{
+    const data = DIVISI_DATA[divisiId];
+    if (!data) return;
+    
+    const cacheKey = divisiId + '|' + Math.round(zCore * 10) + '|' + Math.round(zNeighbor * 10) + '|' + minNeighbors;
+    latestKey[divisiId] = cacheKey;
+    latestParams[divisiId] = {{zCore, zNeighbor, minNeighbors}};
+    const cached = RESULT_CACHE.get(cacheKey);
+    if (cached) {{
+        cacheResult(cacheKey, cached);
+        renderCounts(divisiId, cached);
+        return;
+    }}
+    
+    if (worker) {{
+        if (!data.workerReady) {{
+            // Typed array dikirim sekali per divisi sebagai Transferable (tanpa copy)
+            const zscore = Float64Array.from(data.trees.ZScore);
+            const neighborIdx = Int32Array.from(data.neighbors);
+            worker.postMessage({{type: 'init', divisiId, zscore: zscore.buffer, neighborIdx: neighborIdx.buffer}},
+                               [zscore.buffer, neighborIdx.buffer]);
+            data.workerReady = true;
+        }}
+        worker.postMessage({{type: 'recalc', divisiId, zCore, zNeighbor, minNeighbors, cacheKey}});
+        return;
+    }}
+    
+    computeOnMainThread(divisiId, zCore, zNeighbor, minNeighbors, cacheKey);
 }}
 
-function getHexNeighbors(baris, pokok) {{
-    if (baris % 2 === 0) {{
-        return [
-            [baris-1, pokok-1], [baris-1, pokok], [baris, pokok-1],
-            [baris, pokok+1], [baris+1, pokok-1], [baris+1, pokok]
-        ];
-    }} else {{
-        return [
-            [baris-1, pokok], [baris-1, pokok+1], [baris, pokok-1],
-            [baris, pokok+1], [baris+1, pokok], [baris+1, pokok+1]
-        ];
+function computeOnMainThread(divisiId, zCore, zNeighbor, minNeighbors, cacheKey) {{
+    const data = DIVISI_DATA[divisiId];
+    // Typed array dibuat sekali per divisi dari kolom SoA
+    // Tabel tetangga (N x 6) sudah dihitung di Python, -1 = tidak ada tetangga
+    if (!data.zscore) {{
+        data.zscore = Float64Array.from(data.trees.ZScore);
+        data.neighborIdx = Int32Array.from(data.neighbors);
     }}
+    const counts = classifyKernel(data.zscore, data.neighborIdx, zCore, zNeighbor, minNeighbors);
+    cacheResult(cacheKey, counts);
+    renderCounts(divisiId, counts);
+}}
+
+function renderCounts(divisiId, counts) {{
+    document.getElementById(`merah-${{divisiId}}`).textContent = NF.format(counts.merah);
+    document.getElementById(`oranye-${{divisiId}}`).textContent = NF.format(counts.oranye);
+    document.getElementById(`kuning-${{divisiId}}`).textContent = NF.format(counts.kuning);
+    document.getElementById(`hijau-${{divisiId}}`).textContent = NF.format(counts.hijau);
 }}
 
 function switchTab(id) {{
@@ -817,7 +889,9 @@ window.onclick = function(event) {{
     
     path = output_dir / 'dashboard_v7_final.html'
     with open(path, 'w', encoding='utf-8') as f:
-        f.write(html)
+        f.write(html_head)
+        json.dump(js_data, f, separators=(',', ':'))
+        f.write(html_tail)
     return path
 
 def main():
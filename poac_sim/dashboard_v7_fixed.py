@@ -12,18 +12,35 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
+import base64
+import gzip
+import hashlib
+import io
 import json
 import logging
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 from src.ingestion import load_and_clean_data
 from config import ZSCORE_PRESETS
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    # Numba opsional - fallback ke jalur NumPy
+    HAS_NUMBA = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    # Brotli opsional - tanpa itu hanya sibling .html.gz yang ditulis
+    HAS_BROTLI = False
+
 timestamp = datetime.now().strftime("%Y%m%d_%H%M")
 output_dir = Path(f'data/output/dashboard_v7_fixed_{timestamp}')
 output_dir.mkdir(parents=True, exist_ok=True)
@@ -58,9 +75,13 @@ def load_ame_iv_data(file_path):
     df['N_BARIS'] = df['N_BARIS_REAL']
     df['N_POKOK'] = df['N_POKOK_REAL']
     
-    # Handle comma decimal separator in NDRE125
+    # Handle comma decimal separator in NDRE125 (kolom yang sudah numerik tidak perlu lewat string)
     if 'NDRE125' in df.columns:
-        df['NDRE125'] = df['NDRE125'].astype(str).str.replace(',', '.').astype(float)
+        if pd.api.types.is_numeric_dtype(df['NDRE125']):
+            df['NDRE125'] = df['NDRE125'].astype(float)
+        else:
+            ndre = df['NDRE125'].astype('string').str.replace(',', '.', regex=False)
+            df['NDRE125'] = pd.to_numeric(ndre, errors='coerce').astype(float)
     
     df = df.dropna(subset=['Blok', 'N_BARIS', 'N_POKOK', 'NDRE125'])
     
@@ -76,15 +97,26 @@ def load_productivity_data():
         logging.warning("Productivity data not found")
         return pd.DataFrame()
     
-    df_raw = pd.read_excel(file_path, header=None)
-    df = df_raw.iloc[8:].copy().reset_index(drop=True)
-    df.columns = [f'col_{i}' for i in range(df.shape[1])]
-    
-    df = df.rename(columns={
-        'col_0': 'Blok_Prod', 'col_1': 'Tahun_Tanam', 'col_3': 'Divisi_Prod',
-        'col_11': 'Luas_Ha', 'col_170': 'Produksi_Ton', 
-        'col_173': 'Potensi_Prod_Ton'  # col_173 is Potensi 2025 in Ton
-    })
+    # Cache kolom terpakai (read_excel sheet 170+ kolom lambat); invalid jika xlsx lebih baru
+    cache_path = file_path.with_suffix('.cache.pkl')
+    if cache_path.exists() and cache_path.stat().st_mtime >= file_path.stat().st_mtime:
+        df = pd.read_pickle(cache_path)
+    else:
+        # Hanya parse kolom yang dipakai
+        df_raw = pd.read_excel(file_path, header=None, usecols=[0, 1, 3, 11, 170, 173])
+        df = df_raw.iloc[8:].copy().reset_index(drop=True)
+        df.columns = [f'col_{i}' for i in df_raw.columns]
+        
+        df = df.rename(columns={
+            'col_0': 'Blok_Prod', 'col_1': 'Tahun_Tanam', 'col_3': 'Divisi_Prod',
+            'col_11': 'Luas_Ha', 'col_170': 'Produksi_Ton', 
+            'col_173': 'Potensi_Prod_Ton'  # col_173 is Potensi 2025 in Ton
+        })
+        
+        try:
+            df.to_pickle(cache_path)
+        except OSError as e:
+            logging.warning(f"Productivity cache not written: {e}")
     
     df['Luas_Ha'] = pd.to_numeric(df['Luas_Ha'], errors='coerce')
     df['Tahun_Tanam'] = pd.to_numeric(df['Tahun_Tanam'], errors='coerce')
@@ -118,117 +150,486 @@ def load_productivity_data():
     
     return df_clean
 
-def get_hex_neighbors(baris, pokok):
-    """Get hexagonal neighbors (mata lima pattern)."""
-    if baris % 2 == 0:
-        return [(baris-1, pokok-1), (baris-1, pokok), (baris, pokok-1), 
-                (baris, pokok+1), (baris+1, pokok-1), (baris+1, pokok)]
-    else:
-        return [(baris-1, pokok), (baris-1, pokok+1), (baris, pokok-1),
-                (baris, pokok+1), (baris+1, pokok), (baris+1, pokok+1)]
+def downcast_tree_columns(df):
+    """Downcast kolom per pohon: NDRE125 -> float32, N_BARIS/N_POKOK -> integer terkecil (int16)."""
+    df['NDRE125'] = df['NDRE125'].astype(np.float32)
+    for col in ['N_BARIS', 'N_POKOK']:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
 
-def hybrid_cincin_api_zscore(df, z_core=-1.5, z_neighbor=-0.5, min_neighbors=2):
+def load_tree_data_cached(loader, file_path):
     """
-    Hybrid: Z-Score untuk identifikasi suspect + Algoritma Cincin Api untuk klasifikasi.
+    Load data pohon via loader + downcast_tree_columns, di-cache sebagai pickle di samping CSV.
+    Cache invalid jika CSV lebih baru (pola sama dengan cache data_gabungan).
     """
-    df = df.copy()
+    file_path = Path(file_path)
+    cache_path = file_path.with_suffix('.cache.pkl')
+    if cache_path.exists() and cache_path.stat().st_mtime >= file_path.stat().st_mtime:
+        return pd.read_pickle(cache_path)
+    
+    df = downcast_tree_columns(loader(file_path))
+    try:
+        df.to_pickle(cache_path)
+    except OSError as e:
+        logging.warning(f"Tree data cache not written: {e}")
+    return df
+
+# Faktor pengepakan key koordinat (blok_id, baris, pokok) menjadi satu int64
+KEY_BLOK = 1 << 40
+KEY_BARIS = 1 << 20
+
+# Offset tetangga heksagonal (mata lima) sebagai (d_baris, d_pokok), diindeks paritas baris
+HEX_OFFSETS_EVEN = np.array([(-1, -1), (-1, 0), (0, -1), (0, 1), (1, -1), (1, 0)], dtype=np.int64)
+HEX_OFFSETS_ODD = np.array([(-1, 0), (-1, 1), (0, -1), (0, 1), (1, 0), (1, 1)], dtype=np.int64)
+HEX_OFFSETS = np.stack([HEX_OFFSETS_EVEN, HEX_OFFSETS_ODD])  # (2, 6, 2)
+
+def build_coord_grid(blok_id, baris, pokok, n_blok):
+    """
+    Grid indeks padat per blok (int32, -1 = kosong) untuk lookup koordinat tanpa hashing.
+    Tiap blok mendapat persegi (baris x pokok) dengan padding 1 sel di setiap sisi,
+    sehingga offset tetangga +-1 selalu jatuh di grid blok itu sendiri.
+    Return (grid, cell, width): cell = posisi tiap baris di grid, width = lebar grid bloknya.
+    """
+    bmin = np.full(n_blok, np.iinfo(np.int64).max)
+    bmax = np.full(n_blok, np.iinfo(np.int64).min)
+    pmin = bmin.copy()
+    pmax = bmax.copy()
+    np.minimum.at(bmin, blok_id, baris)
+    np.maximum.at(bmax, blok_id, baris)
+    np.minimum.at(pmin, blok_id, pokok)
+    np.maximum.at(pmax, blok_id, pokok)
+    
+    widths = pmax - pmin + 3
+    sizes = (bmax - bmin + 3) * widths
+    base = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    
+    width = widths[blok_id]
+    cell = base[blok_id] + (baris - bmin[blok_id] + 1) * width + (pokok - pmin[blok_id] + 1)
+    
+    # Duplikat koordinat -> posisi terakhir menang
+    grid = np.full(sizes.sum(), -1, dtype=np.int32)
+    _, first_rev = np.unique(cell[::-1], return_index=True)
+    last = len(cell) - 1 - first_rev
+    grid[cell[last]] = last
+    return grid, cell, width
+
+def get_hex_neighbor_positions(rows, baris, coord_grid):
+    """Get posisi 6 tetangga heksagonal (mata lima) untuk tiap row; -1 jika tidak ada."""
+    grid, cell, width = coord_grid
+    offsets = HEX_OFFSETS[baris[rows] & 1]  # (N, 6, 2)
+    nb_cells = cell[rows, None] + offsets[:, :, 0] * width[rows, None] + offsets[:, :, 1]
+    return grid[nb_cells]
+
+# Kode status (kategori kolom Status): 0=HIJAU, 1=KUNING, 2=MERAH, 3=ORANYE
+STATUS_LABELS = ['HIJAU', 'KUNING', 'MERAH', 'ORANYE']
+
+if HAS_NUMBA:
+    # Multiplier Fibonacci hashing (2^64 / golden ratio) sebagai int64 bertanda
+    HASH_MULT = np.int64(-7046029254386353131)
     
-    # Step 1: Calculate Z-Score per block
-    block_stats = df.groupby('Blok')['NDRE125'].agg(['mean', 'std']).reset_index()
-    block_stats.columns = ['Blok', 'Mean_NDRE', 'SD_NDRE']
-    block_stats['SD_NDRE'] = block_stats['SD_NDRE'].fillna(1).replace(0, 1)
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def build_coord_lookup(keys):
+        """Tabel hash open addressing (linear probing) key koordinat -> posisi.
+        
+        Ukuran tabel = pangkat dua >= 2N; slot kosong ditandai posisi -1.
+        Duplikat koordinat -> posisi terakhir menang.
+        """
+        n = keys.shape[0]
+        size = 2
+        while size < 2 * n:
+            size <<= 1
+        mask = size - 1
+        table_keys = np.zeros(size, np.int64)
+        table_pos = np.full(size, -1, np.int64)
+        for i in range(n):
+            k = keys[i]
+            h = ((k * HASH_MULT) >> 32) & mask
+            while table_pos[h] != -1 and table_keys[h] != k:
+                h = (h + 1) & mask
+            table_keys[h] = k
+            table_pos[h] = i
+        return table_keys, table_pos
+    
+    @njit(cache=True, nogil=True, boundscheck=False, inline='always')
+    def probe_coord(table_keys, table_pos, k):
+        """Posisi baris untuk key koordinat, atau -1 jika tidak ada."""
+        mask = table_keys.shape[0] - 1
+        h = ((k * HASH_MULT) >> 32) & mask
+        while table_pos[h] != -1:
+            if table_keys[h] == k:
+                return table_pos[h]
+            h = (h + 1) & mask
+        return -1
+    
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def cincin_api_kernel(keys, baris, zscore, lookup, z_cores, z_neighbors, min_neighbors, hex_offsets):
+        """
+        Dua tahap Cincin Api (suspect -> MERAH/KUNING, lalu ring ORANYE) untuk P preset sekaligus.
+        Posisi dan Z-Score tetangga dibaca sekali per suspect lalu dibandingkan dengan threshold
+        tiap preset. Return (status, sick, is_cincin) berbentuk (P, N).
+        nogil: aman dijalankan dari thread terpisah.
+        """
+        table_keys, table_pos = lookup
+        n = keys.shape[0]
+        n_preset = z_cores.shape[0]
+        status = np.zeros((n_preset, n), np.int8)
+        sick = np.zeros((n_preset, n), np.int8)
+        is_cincin = np.zeros((n_preset, n), np.bool_)
+        nb_pos = np.full((n, 6), -1, np.int64)
+        z_core_max = z_cores.max()
+        
+        # TAHAP 1: lookup tetangga sekali per suspect (preset mana pun), hitung tetangga sakit per preset
+        for i in range(n):
+            if not zscore[i] < z_core_max:
+                continue
+            offsets = hex_offsets[baris[i] & 1]
+            for j in range(6):
+                k = keys[i] + offsets[j, 0] * KEY_BARIS + offsets[j, 1]
+                nb_pos[i, j] = probe_coord(table_keys, table_pos, k)
+            for p in range(n_preset):
+                if not zscore[i] < z_cores[p]:
+                    continue
+                count = 0
+                for j in range(6):
+                    q = nb_pos[i, j]
+                    if q >= 0 and zscore[q] < z_neighbors[p]:
+                        count += 1
+                sick[p, i] = count
+                status[p, i] = 2 if count >= min_neighbors[p] else 1
+        
+        # TAHAP 2: tetangga MERAH menjadi ORANYE (posisi tetangga dipakai ulang dari tahap 1)
+        for p in range(n_preset):
+            for i in range(n):
+                if status[p, i] != 2:
+                    continue
+                for j in range(6):
+                    q = nb_pos[i, j]
+                    if q >= 0 and status[p, q] != 2:
+                        status[p, q] = 3
+                        is_cincin[p, q] = True
+        
+        return status, sick, is_cincin
+    
+    # Serial (tanpa parallel=True): thread pool numba yang sudah jalan + fork ProcessPoolExecutor
+    # sesudahnya bisa membuat proses hang saat exit, jadi kernel ini aman dipanggil kapan pun
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def slider_grid_kernel(keys, baris, zscore, lookup, z_cores, z_neighbors, min_neighbors, hex_offsets):
+        """
+        Jumlah status per kode (HIJAU, KUNING, MERAH, ORANYE) untuk setiap kombinasi threshold.
+        Return array (len(z_cores), len(z_neighbors), len(min_neighbors), 4).
+        """
+        table_keys, table_pos = lookup
+        n = keys.shape[0]
+        n_core = z_cores.shape[0]
+        n_nb = z_neighbors.shape[0]
+        n_min = min_neighbors.shape[0]
+        counts = np.zeros((n_core, n_nb, n_min, 4), np.int64)
+        
+        # Suspect untuk z_core mana pun = prefix urutan Z-Score naik -> posisi tetangga dicari sekali
+        order = np.argsort(zscore)
+        z_sorted = zscore[order]
+        n_cand = np.searchsorted(z_sorted, z_cores.max())
+        nb_pos = np.full((n_cand, 6), -1, np.int64)
+        nb_z = np.full((n_cand, 6), np.inf)  # Z-Score tetangga (inf = tidak ada), dibaca berurutan
+        for s in range(n_cand):
+            i = order[s]
+            offsets = hex_offsets[baris[i] & 1]
+            for j in range(6):
+                k = keys[i] + offsets[j, 0] * KEY_BARIS + offsets[j, 1]
+                q = probe_coord(table_keys, table_pos, k)
+                nb_pos[s, j] = q
+                if q >= 0:
+                    nb_z[s, j] = zscore[q]
+        
+        # Per pasangan (z_core, z_neighbor); jumlah tetangga sakit dipakai ulang untuk semua min_neighbors
+        for c in range(n_core * n_nb):
+            a = c // n_nb
+            b = c % n_nb
+            n_susp = np.searchsorted(z_sorted[:n_cand], z_cores[a])
+            sick = np.zeros(n_susp, np.int8)
+            for s in range(n_susp):
+                cnt = 0
+                for j in range(6):
+                    cnt += nb_z[s, j] < z_neighbors[b]
+                sick[s] = cnt
+            
+            status = np.zeros(n, np.int8)
+            for m in range(n_min):
+                status[:] = 0
+                merah = 0
+                for s in range(n_susp):
+                    if sick[s] >= min_neighbors[m]:
+                        status[order[s]] = 2
+                        merah += 1
+                    else:
+                        status[order[s]] = 1
+                # Ring: tetangga HIJAU/KUNING dari MERAH menjadi ORANYE
+                oranye = 0
+                kuning_lost = 0
+                for s in range(n_susp):
+                    if sick[s] < min_neighbors[m]:
+                        continue
+                    for j in range(6):
+                        q = nb_pos[s, j]
+                        if q >= 0 and status[q] < 2:
+                            if status[q] == 1:
+                                kuning_lost += 1
+                            status[q] = 3
+                            oranye += 1
+                kuning = n_susp - merah - kuning_lost
+                counts[a, b, m, 0] = n - merah - kuning - oranye
+                counts[a, b, m, 1] = kuning
+                counts[a, b, m, 2] = merah
+                counts[a, b, m, 3] = oranye
+        
+        return counts
+
+def prepare_zscore_lookup(df):
+    """
+    Bagian invarian antar preset: Z-Score per blok + key koordinat terpaket + lookup.
+    Dihitung sekali per divisi lalu dipakai ulang oleh classify_cincin_api.
+    """
+    df = df.reset_index(drop=True)
+    
+    # Step 1: Calculate Z-Score per block - factorize + bincount, tanpa merge
+    # (akumulasi float64 walau NDRE125 disimpan float32)
+    blok_id, uniques = pd.factorize(df['Blok'])
+    ndre = df['NDRE125'].to_numpy(np.float64)
+    count = np.bincount(blok_id, minlength=len(uniques))
+    mean = np.bincount(blok_id, weights=ndre, minlength=len(uniques)) / count
+    dev = ndre - mean[blok_id]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sd = np.sqrt(np.bincount(blok_id, weights=dev * dev, minlength=len(uniques)) / (count - 1))
+    sd[~(sd > 0)] = 1  # SD NaN (blok 1 pohon) atau 0 -> 1
+    
+    df['Mean_NDRE'] = mean[blok_id]
+    df['SD_NDRE'] = sd[blok_id]
+    df['ZScore'] = dev / df['SD_NDRE'].to_numpy()
+    
+    # Step 2: Build coordinate lookup (key int64 terpaket: blok_id | baris | pokok)
+    br = df['N_BARIS'].to_numpy(np.int64)
+    pk = df['N_POKOK'].to_numpy(np.int64)
+    keys = blok_id.astype(np.int64) * KEY_BLOK + br * KEY_BARIS + pk
+    
+    if HAS_NUMBA:
+        coord_lookup = build_coord_lookup(keys)
+    else:
+        # Grid padat per blok - lookup tetangga cukup satu indexing array
+        coord_lookup = build_coord_grid(blok_id, br, pk, len(uniques))
     
-    df = df.merge(block_stats, on='Blok', how='left')
-    df['ZScore'] = (df['NDRE125'] - df['Mean_NDRE']) / df['SD_NDRE']
+    return {'df': df, 'keys': keys, 'baris': br, 'lookup': coord_lookup}
+
+def attach_classification(df, status, sick, is_cincin):
+    """Salinan df dengan kolom hasil klasifikasi (Status kategorikal dari kode int8)."""
+    df = df.copy()
+    df['Status'] = pd.Categorical.from_codes(status, categories=STATUS_LABELS)
+    df['Sick_Neighbors'] = sick
+    df['Is_Cincin_Api'] = is_cincin
+    return df
+
+def classify_cincin_api(prepared, z_core=-1.5, z_neighbor=-0.5, min_neighbors=2):
+    """Klasifikasi Cincin Api untuk satu preset di atas hasil prepare_zscore_lookup."""
+    if HAS_NUMBA:
+        return classify_cincin_api_presets(prepared, [(z_core, z_neighbor, min_neighbors)])[0]
     
-    # Step 2: Build coordinate lookup
-    coord_lookup = {}
-    for idx, row in df.iterrows():
-        key = (row['Blok'], int(row['N_BARIS']), int(row['N_POKOK']))
-        coord_lookup[key] = idx
+    df = prepared['df']
+    keys = prepared['keys']
+    br = prepared['baris']
+    coord_lookup = prepared['lookup']
+    zscore = df['ZScore'].to_numpy()
     
-    # Step 3: Initialize - mark suspects using Z-Score
-    df['Status'] = 'HIJAU'
-    df['Sick_Neighbors'] = 0
-    df['Is_Cincin_Api'] = False
+    # Step 3: Initialize output buffers (semua HIJAU) - mark suspects using Z-Score
+    n = len(df)
+    status = np.zeros(n, dtype=np.int8)
+    sick = np.zeros(n, dtype=np.int8)  # maks 6 tetangga
+    is_cincin = np.zeros(n, dtype=bool)
     
-    suspect_mask = df['ZScore'] < z_core
-    suspect_indices = df[suspect_mask].index.tolist()
+    suspect_idx = np.flatnonzero(zscore < z_core)
     
     # Step 4: Count sick neighbors for suspects (TAHAP 1 Cincin Api)
-    for idx in suspect_indices:
-        row = df.loc[idx]
-        blok = row['Blok']
-        baris = int(row['N_BARIS'])
-        pokok = int(row['N_POKOK'])
-        
-        neighbors = get_hex_neighbors(baris, pokok)
-        sick_count = 0
-        
-        for n_baris, n_pokok in neighbors:
-            neighbor_key = (blok, n_baris, n_pokok)
-            if neighbor_key in coord_lookup:
-                n_idx = coord_lookup[neighbor_key]
-                if df.loc[n_idx, 'ZScore'] < z_neighbor:
-                    sick_count += 1
-        
-        df.loc[idx, 'Sick_Neighbors'] = sick_count
-        
-        if sick_count >= min_neighbors:
-            df.loc[idx, 'Status'] = 'MERAH'
-        else:
-            df.loc[idx, 'Status'] = 'KUNING'
+    nb = get_hex_neighbor_positions(suspect_idx, br, coord_lookup)
+    valid = nb >= 0
+    sick[suspect_idx] = (valid & (zscore[np.where(valid, nb, 0)] < z_neighbor)).sum(axis=1)
+    is_merah = sick[suspect_idx] >= min_neighbors
+    status[suspect_idx] = np.where(is_merah, 2, 1)
     
     # Step 5: Create Cincin Api (TAHAP 2) - neighbors of MERAH become ORANYE
-    merah_indices = df[df['Status'] == 'MERAH'].index.tolist()
-    
-    for idx in merah_indices:
-        row = df.loc[idx]
-        blok = row['Blok']
-        baris = int(row['N_BARIS'])
-        pokok = int(row['N_POKOK'])
-        
-        neighbors = get_hex_neighbors(baris, pokok)
-        
-        for n_baris, n_pokok in neighbors:
-            neighbor_key = (blok, n_baris, n_pokok)
-            if neighbor_key in coord_lookup:
-                n_idx = coord_lookup[neighbor_key]
-                if df.loc[n_idx, 'Status'] != 'MERAH':
-                    df.loc[n_idx, 'Status'] = 'ORANYE'
-                    df.loc[n_idx, 'Is_Cincin_Api'] = True
+    ring = get_hex_neighbor_positions(suspect_idx[is_merah], br, coord_lookup)
+    ring = np.unique(ring[ring >= 0])
+    ring = ring[status[ring] != 2]
+    status[ring] = 3
+    is_cincin[ring] = True
     
-    return df
+    return attach_classification(df, status, sick, is_cincin)
 
-def generate_cluster_map(df, blok, preset_name, rank, output_dir, divisi_id):
-    """Generate matplotlib cluster map with proper Cincin Api visualization."""
+def classify_cincin_api_presets(prepared, thresholds):
+    """
+    Klasifikasi beberapa preset sekaligus; thresholds = list (z_core, z_neighbor, min_neighbors).
+    Numba: satu kernel fusi untuk semua preset (Z-Score & lookup tetangga dibaca sekali).
+    NumPy: per preset, paralel di thread (operasi array melepas GIL).
+    Return list df terklasifikasi, urut sesuai thresholds.
+    """
+    if not HAS_NUMBA:
+        with ThreadPoolExecutor(max_workers=len(thresholds)) as executor:
+            return list(executor.map(lambda t: classify_cincin_api(prepared, *t), thresholds))
+    
+    z_cores, z_neighbors, min_neighbors = zip(*thresholds)
+    status, sick, is_cincin = cincin_api_kernel(
+        prepared['keys'], prepared['baris'], prepared['df']['ZScore'].to_numpy(), prepared['lookup'],
+        np.array(z_cores, dtype=np.float64), np.array(z_neighbors, dtype=np.float64),
+        np.array(min_neighbors, dtype=np.int64), HEX_OFFSETS
+    )
+    return [attach_classification(prepared['df'], status[p], sick[p], is_cincin[p])
+            for p in range(len(thresholds))]
+
+# Nilai slider threshold di dashboard (z-core -3..0, z-neighbor -2..0 step 0.1; min neighbors 1..6)
+SLIDER_Z_CORE = np.round(np.arange(-30, 1) / 10, 1)
+SLIDER_Z_NEIGHBOR = np.round(np.arange(-20, 1) / 10, 1)
+SLIDER_MIN_NEIGHBORS = np.arange(1, 7)
+
+def slider_grid_counts(prepared):
+    """
+    Jumlah MERAH/ORANYE/KUNING/HIJAU untuk semua kombinasi slider (31 x 21 x 6), dihitung saat build
+    agar dashboard cukup lookup per gerakan slider. None tanpa Numba (dashboard hitung live di JS).
+    """
+    if not HAS_NUMBA:
+        return None
+    counts = slider_grid_kernel(
+        prepared['keys'], prepared['baris'], prepared['df']['ZScore'].to_numpy(), prepared['lookup'],
+        SLIDER_Z_CORE, SLIDER_Z_NEIGHBOR, SLIDER_MIN_NEIGHBORS.astype(np.int64), HEX_OFFSETS
+    )
+    return {
+        'z_core': SLIDER_Z_CORE.tolist(),
+        'z_neighbor': SLIDER_Z_NEIGHBOR.tolist(),
+        'min_neighbors': SLIDER_MIN_NEIGHBORS.tolist(),
+        'labels': [s.lower() for s in STATUS_LABELS],
+        'counts': counts.ravel().tolist()
+    }
+
+def hybrid_cincin_api_zscore(df, z_core=-1.5, z_neighbor=-0.5, min_neighbors=2):
+    """
+    Hybrid: Z-Score untuk identifikasi suspect + Algoritma Cincin Api untuk klasifikasi.
+    """
+    return classify_cincin_api(prepare_zscore_lookup(df), z_core, z_neighbor, min_neighbors)
+
+def top_n_positions(values, n, largest=True):
+    """
+    Posisi n nilai terbesar (atau terkecil) terurut, setara nlargest/nsmallest(keep='first').
+    np.argpartition mencari nilai batas, lalu hanya kandidat yang diurutkan (stable).
+    """
+    values = np.asarray(values, dtype=float)
+    is_nan = np.isnan(values)
+    valid = np.flatnonzero(~is_nan)
+    v = values[valid] if largest else -values[valid]
+    if len(v) > n:
+        kth = v[np.argpartition(-v, n - 1)[n - 1]]
+        cand = np.flatnonzero(v >= kth)
+    else:
+        cand = np.arange(len(v))
+    top = valid[cand[np.argsort(-v[cand], kind='stable')][:n]]
+    # Seperti pandas: NaN hanya mengisi sisa jika nilai valid kurang dari n
+    return np.concatenate([top, np.flatnonzero(is_nan)[:n - len(top)]])
+
+def file_digest(file_path):
+    """SHA-256 isi file (16 hex pertama) - identitas data input untuk cache klasifikasi."""
+    return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()[:16]
+
+# Naikkan bila format cache klasifikasi berubah tanpa perubahan source modul
+CLASSIFICATION_CACHE_VERSION = 1
+
+def classifier_code_digest():
+    """
+    SHA-256 source modul ini (loader, downcast, klasifikasi, kernel) + modul ingestion.
+    Perubahan kode apa pun di situ membuat cache klasifikasi lama tidak terpakai.
+    """
+    h = hashlib.sha256(f'v{CLASSIFICATION_CACHE_VERSION}'.encode())
+    for source in (__file__, sys.modules[load_and_clean_data.__module__].__file__):
+        h.update(Path(source).read_bytes())
+    return h.hexdigest()
+
+def classification_cache_path(output_dir, data_digest, preset_name):
+    """Path cache hasil klasifikasi per (isi data input, nilai threshold preset, versi kode)."""
+    preset = json.dumps(ZSCORE_PRESETS[preset_name], sort_keys=True)
+    key_digest = hashlib.sha256((preset + classifier_code_digest()).encode()).hexdigest()[:8]
+    return output_dir.parent / '.cache' / f'{data_digest}_{preset_name}_{key_digest}.pkl'
+
+def compute_block_stats(df_classified):
+    """Block-level stats: jumlah MERAH/ORANYE, total pohon, dan Attack_Pct per blok."""
+    # Satu np.bincount atas (blok_id, kode status) -> tabel hitungan (n_blok, n_status)
+    blok_id, bloks = pd.factorize(df_classified['Blok'], sort=True)
+    codes = df_classified['Status'].cat.codes.to_numpy()
+    valid = blok_id >= 0  # Blok NaN tidak ikut, sama seperti groupby
+    n_status = len(STATUS_LABELS)
+    counts = np.bincount(blok_id[valid] * n_status + codes[valid],
+                         minlength=len(bloks) * n_status).reshape(len(bloks), n_status)
+    block_stats = pd.DataFrame({
+        'Blok': bloks,
+        'MERAH': counts[:, STATUS_LABELS.index('MERAH')],
+        'ORANYE': counts[:, STATUS_LABELS.index('ORANYE')],
+        'Total': counts.sum(axis=1)
+    })
+    block_stats['Attack_Pct'] = (block_stats['MERAH'] + block_stats['ORANYE']) / block_stats['Total'] * 100
+    return block_stats
+
+# Figure peta dipakai ulang per proses (alokasi Figure/canvas hanya sekali per worker)
+_CLUSTER_FIG = None
+
+def get_cluster_figure():
+    """Return (fig, ax) peta cluster milik proses ini, dengan axes yang sudah dikosongkan."""
+    global _CLUSTER_FIG
+    # Import matplotlib (~0.3 dtk) ditunda sampai benar-benar render peta;
+    # script lain yang hanya memakai loader/klasifikasi tidak ikut membayar
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    if _CLUSTER_FIG is None:
+        _CLUSTER_FIG = plt.subplots(figsize=(14, 12))
+    else:
+        fig, ax = _CLUSTER_FIG
+        ax.cla()
+        # Reset margin ke default agar tight_layout mulai dari kondisi yang sama seperti figure baru
+        fig.subplots_adjust(**{k: plt.rcParams[f'figure.subplot.{k}']
+                               for k in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    return _CLUSTER_FIG
+
+def generate_cluster_map(df, blok, preset_name, rank, output_dir, divisi_id, return_png=False):
+    """
+    Generate matplotlib cluster map with proper Cincin Api visualization.
+    return_png: PNG dikembalikan sebagai bytes di key 'png' (tidak ditulis ke disk) - dipakai worker
+    render agar penulisan file dilakukan thread I/O di proses utama.
+    """
     block_df = df[df['Blok'] == blok].copy().reset_index(drop=True)
     if len(block_df) == 0:
         return None
     
-    merah = (block_df['Status'] == 'MERAH').sum()
-    oranye = (block_df['Status'] == 'ORANYE').sum()
-    kuning = (block_df['Status'] == 'KUNING').sum()
-    hijau = (block_df['Status'] == 'HIJAU').sum()
+    # Status kategorikal: satu value_counts atas kode int8 untuk semua status
+    status_counts = block_df['Status'].value_counts()
+    merah = status_counts['MERAH']
+    oranye = status_counts['ORANYE']
+    kuning = status_counts['KUNING']
+    hijau = status_counts['HIJAU']
     total = len(block_df)
     
-    fig, ax = plt.subplots(figsize=(14, 12))
+    import matplotlib.patches as mpatches
+    fig, ax = get_cluster_figure()
     
     colors = {'MERAH': '#e74c3c', 'ORANYE': '#e67e22', 'KUNING': '#f1c40f', 'HIJAU': '#27ae60'}
     sizes = {'MERAH': 80, 'ORANYE': 70, 'KUNING': 60, 'HIJAU': 50}
     
-    # Apply hex offset and plot by layer
-    for status in ['HIJAU', 'KUNING', 'ORANYE', 'MERAH']:
-        mask = block_df['Status'] == status
-        if not mask.any():
-            continue
-        subset = block_df[mask]
-        x = subset['N_POKOK'] + np.where(subset['N_BARIS'] % 2 == 0, 0.5, 0)
-        y = subset['N_BARIS']
-        ax.scatter(x, y, c=colors[status], s=sizes[status], alpha=0.85,
-                  edgecolors='black', linewidths=0.5, zorder=['HIJAU','KUNING','ORANYE','MERAH'].index(status)+1)
-    
-    legend = [mpatches.Patch(color=c, label=f'{s} ({(block_df["Status"]==s).sum()})') 
+    # Apply hex offset and plot in one scatter; urutan layer HIJAU -> KUNING -> ORANYE -> MERAH
+    layer_order = ['HIJAU', 'KUNING', 'ORANYE', 'MERAH']
+    layer_of_code = np.array([layer_order.index(s) for s in STATUS_LABELS])
+    codes = layer_of_code[block_df['Status'].cat.codes.to_numpy()]
+    order = np.argsort(codes, kind='stable')
+    baris = block_df['N_BARIS'].to_numpy()
+    x = block_df['N_POKOK'].to_numpy() + 0.5 * ((baris.astype(np.int64) & 1) == 0)
+    color_arr = np.array([colors[s] for s in layer_order])[codes]
+    size_arr = np.array([sizes[s] for s in layer_order])[codes]
+    ax.scatter(x[order], baris[order], c=color_arr[order], s=size_arr[order], alpha=0.85,
+              edgecolors='black', linewidths=0.5, rasterized=True, zorder=1)
+    
+    legend = [mpatches.Patch(color=c, label=f'{s} ({status_counts[s]})') 
               for s, c in colors.items()]
     ax.legend(handles=legend, loc='upper right', fontsize=11, framealpha=0.9, shadow=True)
     
@@ -249,52 +650,81 @@ def generate_cluster_map(df, blok, preset_name, rank, output_dir, divisi_id):
            color='white', ha='right', va='top', 
            bbox=dict(boxstyle='round', facecolor=preset_colors.get(preset_name, '#333')))
     
-    plt.tight_layout()
+    fig.tight_layout()
     
-    divisi_dir = output_dir / divisi_id
-    divisi_dir.mkdir(exist_ok=True)
     filename = f'cluster_{preset_name}_{rank:02d}_{blok}.png'
-    fig.savefig(divisi_dir / filename, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close(fig)
-    
-    return {'filename': filename, 'blok': blok, 'rank': rank, 'merah': merah, 'oranye': oranye}
+    buf = io.BytesIO()
+    # bbox tight tetap dipakai (aspect equal -> plot sempit); zlib level rendah untuk encode PNG cepat
+    fig.savefig(buf, format='png', dpi=110, bbox_inches='tight', facecolor='white',
+                pil_kwargs={'compress_level': 1, 'optimize': False})
+    
+    result = {'filename': filename, 'blok': blok, 'rank': rank, 'merah': merah, 'oranye': oranye}
+    if return_png:
+        result['png'] = buf.getvalue()
+    else:
+        divisi_dir = output_dir / divisi_id
+        divisi_dir.mkdir(exist_ok=True)
+        (divisi_dir / filename).write_bytes(buf.getvalue())
+    return result
 
-def analyze_divisi(df, divisi_name, prod_df, output_dir):
-    """Analyze division with hybrid algorithm and yield correlation."""
+def analyze_divisi(df, divisi_name, prod_df, output_dir, pool=None, data_digest=None):
+    """
+    Analyze division with hybrid algorithm and yield correlation.
+    pool: ProcessPoolExecutor bersama untuk render peta; dibuat sementara jika None.
+    data_digest: file_digest data input; jika diisi, hasil klasifikasi per preset
+    di-cache di disk sehingga run ulang (mis. hanya ubah HTML) tidak menghitung ulang.
+    """
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as own_pool:
+            return analyze_divisi(df, divisi_name, prod_df, output_dir, pool=own_pool,
+                                  data_digest=data_digest)
+    
     divisi_id = divisi_name.replace(' ', '_')
     results = {}
     block_maps = {}
-    
-    for preset_name in ['konservatif', 'standar', 'agresif']:
-        preset = ZSCORE_PRESETS[preset_name]
-        
-        df_classified = hybrid_cincin_api_zscore(
-            df,
-            z_core=preset['z_threshold_core'],
-            z_neighbor=preset['z_threshold_neighbor'],
-            min_neighbors=preset['min_stressed_neighbors']
-        )
+    map_jobs = {}
+    
+    presets = ['konservatif', 'standar', 'agresif']
+    cache_paths = {p: classification_cache_path(output_dir, data_digest, p) if data_digest else None
+                   for p in presets}
+    
+    classified = {p: pd.read_pickle(c) for p, c in cache_paths.items() if c is not None and c.exists()}
+    missing = [p for p in presets if p not in classified]
+    
+    # Z-Score dan lookup koordinat tidak bergantung preset - hitung sekali, dipakai klasifikasi
+    # dan (jika ada Numba) tabel slider di generate_html; dilewati bila semua preset dari cache
+    prepared = prepare_zscore_lookup(df) if missing or HAS_NUMBA else None
+    
+    if missing:
+        # Semua preset yang belum ter-cache diklasifikasi dalam satu panggilan
+        thresholds = [(ZSCORE_PRESETS[p]['z_threshold_core'], ZSCORE_PRESETS[p]['z_threshold_neighbor'],
+                       ZSCORE_PRESETS[p]['min_stressed_neighbors']) for p in missing]
+        for preset_name, df_classified in zip(missing, classify_cincin_api_presets(prepared, thresholds)):
+            classified[preset_name] = (df_classified, compute_block_stats(df_classified))
+            cache_path = cache_paths[preset_name]
+            if cache_path is not None:
+                try:
+                    cache_path.parent.mkdir(parents=True, exist_ok=True)
+                    pd.to_pickle(classified[preset_name], cache_path)
+                except OSError as e:
+                    logging.warning(f"Classification cache not written: {e}")
+    
+    for preset_name in presets:
+        df_classified, block_stats = classified[preset_name]
         
         # Stats
-        stats = {s: (df_classified['Status'] == s).sum() for s in ['MERAH', 'ORANYE', 'KUNING', 'HIJAU']}
-        
-        # Block-level stats
-        block_stats = df_classified.groupby('Blok').agg({
-            'Status': [lambda x: (x=='MERAH').sum(), lambda x: (x=='ORANYE').sum(), 'count']
-        }).reset_index()
-        block_stats.columns = ['Blok', 'MERAH', 'ORANYE', 'Total']
-        block_stats['Attack_Pct'] = (block_stats['MERAH'] + block_stats['ORANYE']) / block_stats['Total'] * 100
+        counts = dict(zip(STATUS_LABELS, np.bincount(df_classified['Status'].cat.codes, minlength=len(STATUS_LABELS))))
+        stats = {s: counts[s] for s in ['MERAH', 'ORANYE', 'KUNING', 'HIJAU']}
         
-        top_blocks = block_stats.nlargest(5, 'Attack_Pct')
+        top_blocks = block_stats.iloc[top_n_positions(block_stats['Attack_Pct'], 5)]
         
-        # Generate maps
-        maps = []
-        for rank, (_, row) in enumerate(top_blocks.iterrows(), 1):
-            m = generate_cluster_map(df_classified, row['Blok'], preset_name, rank, output_dir, divisi_id)
-            if m:
-                maps.append(m)
+        # Map jobs - hanya baris blok terkait yang dikirim ke worker
+        map_cols = df_classified[['Blok', 'N_BARIS', 'N_POKOK', 'Status']]
+        map_jobs[preset_name] = [
+            (map_cols[map_cols['Blok'] == blok], blok, preset_name, rank, output_dir, divisi_id)
+            for rank, blok in enumerate(top_blocks['Blok'], 1)
+        ]
         
-        block_maps[preset_name] = maps
         results[preset_name] = {
             'df': df_classified, 
             'stats': stats,
@@ -305,12 +735,32 @@ def analyze_divisi(df, divisi_name, prod_df, output_dir):
         
         logging.info(f"{divisi_name} {preset_name}: MERAH={stats['MERAH']}, ORANYE={stats['ORANYE']}")
     
+    # Disimpan di samping hasil per preset agar generate_html tidak menghitung ulang
+    results['prepared'] = prepared
+    
+    # Generate maps - render PNG paralel (CPU-bound, independen per blok);
+    # file ditulis thread I/O sehingga flush disk tumpang tindih dengan render berikutnya
+    divisi_dir = output_dir / divisi_id
+    divisi_dir.mkdir(exist_ok=True)
+    futures = {p: [pool.submit(generate_cluster_map, *job, return_png=True) for job in jobs]
+               for p, jobs in map_jobs.items()}
+    with ThreadPoolExecutor(max_workers=4) as io_pool:
+        writes = []
+        for preset_name, preset_futures in futures.items():
+            block_maps[preset_name] = [m for m in (f.result() for f in preset_futures) if m]
+            for m in block_maps[preset_name]:
+                writes.append(io_pool.submit((divisi_dir / m['filename']).write_bytes, m.pop('png')))
+        for w in writes:
+            w.result()
+    
     return results, block_maps
 
+# Pola nama blok: prefix huruf + nomor + suffix opsional (B16, A012A)
+BLOK_PATTERN = re.compile(r'([A-Z]+)(\d+)([A-Z]*)')
+
 def convert_gano_to_prod_pattern(gano_blok):
     """Convert Ganoderma block (B16) to Productivity pattern (B016)."""
-    import re
-    match = re.match(r'([A-Z]+)(\d+)([A-Z]*)', str(gano_blok))
+    match = BLOK_PATTERN.match(str(gano_blok))
     if match:
         prefix, num, suffix = match.groups()
         return f"{prefix}{num.zfill(3)}"
@@ -318,37 +768,130 @@ def convert_gano_to_prod_pattern(gano_blok):
 
 def convert_prod_to_gano_pattern(prod_blok):
     """Convert Productivity block (A012A) to Ganoderma pattern (A12)."""
-    import re
-    match = re.match(r'([A-Z]+)(\d+)([A-Z]*)', str(prod_blok))
+    match = BLOK_PATTERN.match(str(prod_blok))
     if match:
         prefix, num, suffix = match.groups()
         return f"{prefix}{int(num)}"
     return str(prod_blok)
 
-def generate_html(output_dir, all_results, all_maps, prod_df):
-    """Generate HTML with both POVs."""
-    presets_json = json.dumps(ZSCORE_PRESETS)
-    
-    # Prepare data for JavaScript real-time recalculation
+def format_or_na(values, spec):
+    """Format tiap nilai dengan format spec; NaN -> 'N/A'."""
+    return [format(v, spec) if pd.notna(v) else "N/A" for v in values]
+
+# Tipe kolom pohon di payload JS (little-endian) -> typed array yang sama di getColumns
+JS_COLUMN_DTYPES = {'Blok': '<u2', 'N_BARIS': '<i2', 'N_POKOK': '<i2', 'ZScore10': 'i1'}
+
+def pack_column_b64(values, dtype):
+    """
+    Pack kolom numerik ke bytes biner base64 untuk didecode langsung sebagai typed array di browser.
+    Dtype integer dicek rentangnya dulu: nilai di luar rentang -> ValueError, bukan wrap diam-diam.
+    """
+    values = np.asarray(values)
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'iu' and values.size:
+        info = np.iinfo(dtype)
+        lo, hi = values.min(), values.max()
+        if lo < info.min or hi > info.max:
+            raise ValueError(f"Column range [{lo}, {hi}] does not fit {dtype} [{info.min}, {info.max}]")
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+def write_precompressed(path):
+    """Tulis sibling .gz (dan .br jika brotli tersedia) agar static server bisa kirim bytes pre-encoded."""
+    data = path.read_bytes()
+    try:
+        # mtime=0 -> output gzip deterministik untuk input yang sama
+        path.with_name(path.name + '.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        if HAS_BROTLI:
+            path.with_name(path.name + '.br').write_bytes(brotli.compress(data, quality=11))
+    except OSError as e:
+        logging.warning(f"Precompressed dashboard not written: {e}")
+
+def quantize_zscore(zscore):
+    """
+    ZScore -> int8 floor(z * 10), diklip ke rentang int8. Untuk threshold kelipatan 0.1 (k / 10)
+    berlaku z < k/10 <=> floor(z * 10) < k, jadi perbandingan slider tetap eksak.
+    NaN -> 127 (tidak pernah di bawah threshold <= 0).
+    """
+    z10 = np.floor(np.asarray(zscore, dtype=np.float64) * 10)
+    return np.nan_to_num(np.clip(z10, -128, 127), nan=127).astype(np.int8)
+
+def generate_html(output_dir, all_results, all_maps, prod_df, preset=None):
+    """
+    Generate HTML with both POVs.
+    preset: None -> dashboard interaktif (slider + klasifikasi live di JS);
+    nama preset -> halaman statis preset tsb (jumlah & peta prekomputasi, tanpa JS klasifikasi).
+    """
+    view = preset or 'standar'
+    # JSON ringkas (tanpa spasi separator) -> byte payload lebih kecil
+    presets_json = json.dumps(ZSCORE_PRESETS, separators=(',', ':'))
+    
+    # Jumlah status preset sudah dihitung di analyze_divisi -> konstanta JS, tanpa klasifikasi di browser
+    preset_counts = {
+        p: {divisi.replace(' ', '_'): {s.lower(): int(data['results'][p]['stats'][s])
+                                       for s in ['MERAH', 'ORANYE', 'KUNING', 'HIJAU']}
+            for divisi, data in all_results.items()}
+        for p in ZSCORE_PRESETS
+    }
+    preset_counts_json = json.dumps(preset_counts, separators=(',', ':'))
+    
+    # Prepare data for JavaScript real-time recalculation (hanya dashboard interaktif)
     js_divisi_data = {}
-    for divisi, data in all_results.items():
-        divisi_id = divisi.replace(' ', '_')
-        results = data['results']
-        df_full = results['standar']['df']
+    if preset is None:
+        for divisi, data in all_results.items():
+            divisi_id = divisi.replace(' ', '_')
+            results = data['results']
+            df_full = results['standar']['df']
         
-        # Extract essential tree data for JS
-        tree_data = df_full[['Blok', 'N_BARIS', 'N_POKOK', 'ZScore', 'Mean_NDRE', 'SD_NDRE']].to_dict('records')
+            # Extract essential tree data for JS - format kolom biner (base64 per kolom, lihat JS_COLUMN_DTYPES)
+            # Blok dikirim sebagai kode integer + tabel nama;
+            # ZScore dikuantisasi int8 (x10, floor) - cukup untuk threshold slider step 0.1
+            blok_codes, blok_names = pd.factorize(df_full['Blok'])
+            tree_cols = {'Blok': pack_column_b64(blok_codes, JS_COLUMN_DTYPES['Blok']),
+                         'ZScore10': pack_column_b64(quantize_zscore(df_full['ZScore']), JS_COLUMN_DTYPES['ZScore10'])}
+            tree_cols.update({c: pack_column_b64(df_full[c].to_numpy(), JS_COLUMN_DTYPES[c])
+                              for c in ['N_BARIS', 'N_POKOK']})
         
-        js_divisi_data[divisi_id] = {
-            'trees': tree_data,
-            'total_trees': len(df_full),
-            'total_blocks': df_full['Blok'].nunique()
-        }
-    
-    js_data_json = json.dumps(js_divisi_data)
-    
-    divisi_tabs = ""
-    divisi_content = ""
+            # Batas koordinat per kode blok (padding 1 sel) untuk grid indeks pohon di JS: [baris0, pokok0, rows, cols]
+            bounds = df_full.groupby(blok_codes).agg(
+                bmin=('N_BARIS', 'min'), bmax=('N_BARIS', 'max'), pmin=('N_POKOK', 'min'), pmax=('N_POKOK', 'max')
+            )
+            block_bounds = [
+                [int(r.bmin) - 1, int(r.pmin) - 1, int(r.bmax - r.bmin) + 3, int(r.pmax - r.pmin) + 3]
+                for r in bounds.itertuples()
+            ]
+        
+            js_divisi_data[divisi_id] = {
+                'cols': tree_cols,
+                'blok_names': blok_names.tolist(),
+                'blocks': block_bounds,
+                'grid': slider_grid_counts(results['prepared']),
+                'total_trees': len(df_full),
+                'total_blocks': df_full['Blok'].nunique()
+            }
+    
+    # Fragmen per divisi dikumpulkan dalam list lalu ditulis berurutan ke file handle
+    # (tanpa konkatenasi string multi-MB berulang)
+    divisi_tabs = []
+    divisi_content = []
+    
+    # Key blok ternormalisasi (B16 / B016A -> B16) untuk hash join Ganoderma <-> produktivitas
+    # Filter only productive age (3-25 years) - exclude TBM (<3y) and old plants (>25y)
+    if not prod_df.empty:
+        productive_df = prod_df[(prod_df['Umur_Tahun'] >= 3) & (prod_df['Umur_Tahun'] <= 25)]
+        productive_df = productive_df.assign(Blok_Key=productive_df['Blok_Prod'].map(convert_prod_to_gano_pattern))
+        # Metrik produktivitas per key: nama blok pertama + rata-rata metrik.
+        # pd.Series.mean (bukan 'mean') agar pembulatan sama persis dengan mean per subset
+        mean = pd.Series.mean
+        prod_metrics = productive_df.groupby('Blok_Key', sort=False).agg(
+            Blok_Prod=('Blok_Prod', 'first'), Luas_Ha=('Luas_Ha', mean),
+            Produksi_Ton=('Produksi_Ton', mean), Potensi_Prod_Ton=('Potensi_Prod_Ton', mean),
+            Yield_TonHa=('Yield_TonHa', mean), Potensi_Yield=('Potensi_Yield', mean),
+            Gap_Yield=('Gap_Yield', mean), Umur_Tahun=('Umur_Tahun', mean)
+        )
+    else:
+        productive_df = prod_df
+        prod_metrics = pd.DataFrame(columns=['Blok_Prod', 'Luas_Ha', 'Produksi_Ton', 'Potensi_Prod_Ton',
+                                             'Yield_TonHa', 'Potensi_Yield', 'Gap_Yield', 'Umur_Tahun'])
     
     for idx, (divisi, data) in enumerate(all_results.items()):
         divisi_id = divisi.replace(' ', '_')
@@ -356,7 +899,7 @@ def generate_html(output_dir, all_results, all_maps, prod_df):
         
         results = data['results']
         block_maps = all_maps[divisi]
-        stats = results['standar']['stats']
+        stats = results[view]['stats']
         
         # Build preset cards
         preset_cards = ""
@@ -374,137 +917,81 @@ def generate_html(output_dir, all_results, all_maps, prod_df):
                 </div>
             </div>'''
         
-        # Build maps HTML
+        # Build maps HTML (halaman statis: hanya peta preset tsb)
         maps_html = ""
-        for p in ['konservatif', 'standar', 'agresif']:
+        for p in ([preset] if preset else ['konservatif', 'standar', 'agresif']):
             items = "".join([f'<div class="map-item"><img src="{divisi_id}/{m["filename"]}"><div class="map-label">{m["blok"]}</div></div>' 
                             for m in block_maps.get(p, [])])
             maps_html += f'<div class="maps-section"><h4>{p.upper()}</h4><div class="maps-grid">{items}</div></div>'
         
         # POV Tables
-        block_stats = results['standar']['block_stats']
-        top_gano = block_stats.nlargest(10, 'Attack_Pct')
-        
-        gano_rows = ""
-        for i, (_, r) in enumerate(top_gano.iterrows(), 1):
-            # FIXED: Convert B16 → B016 for matching
-            prod_pattern = convert_gano_to_prod_pattern(r['Blok'])
-            yield_matches = prod_df[prod_df['Blok_Prod'].str.contains(prod_pattern, na=False, regex=False)]
-            
-            # Filter only productive age (3-25 years) - exclude TBM (<3y) and old plants (>25y)
-            if not yield_matches.empty:
-                yield_matches = yield_matches[(yield_matches['Umur_Tahun'] >= 3) & (yield_matches['Umur_Tahun'] <= 25)]
-            
-            # Skip block if no productive age match
-            if yield_matches.empty:
-                continue
-            
-            # Get block names and metrics
-            blok_prod_name = yield_matches['Blok_Prod'].iloc[0]
-            luas_ha = yield_matches['Luas_Ha'].mean()
-            produksi_real = yield_matches['Produksi_Ton'].mean()
-            produksi_pot = yield_matches['Potensi_Prod_Ton'].mean()
-            yield_val = yield_matches['Yield_TonHa'].mean()
-            potensi_yield = yield_matches['Potensi_Yield'].mean()
-            gap_yield = yield_matches['Gap_Yield'].mean()
-            umur_val = int(yield_matches['Umur_Tahun'].mean())
-            
-            # Format values
-            luas_str = f"{luas_ha:.1f}" if pd.notna(luas_ha) else "N/A"
-            real_str = f"{produksi_real:.2f}" if pd.notna(produksi_real) else "N/A"
-            pot_str = f"{produksi_pot:.2f}" if pd.notna(produksi_pot) else "N/A"
-            gap_prod = (produksi_pot - produksi_real) if (pd.notna(produksi_pot) and pd.notna(produksi_real)) else None
-            gap_prod_str = f"{gap_prod:.2f}" if pd.notna(gap_prod) else "N/A"
-            umur_str = f"{umur_val} th" if pd.notna(umur_val) else "N/A"
-            
-            # Color code gap production (red if big gap, green if small)
-            if pd.notna(gap_prod):
-                if gap_prod > 30:
-                    gap_color = "#e74c3c"  # Red - big gap (>30 Ton)
-                elif gap_prod > 10:
-                    gap_color = "#f39c12"  # Orange - medium gap (10-30 Ton)
-                else:
-                    gap_color = "#27ae60"  # Green - small gap (<10 Ton)
-            else:
-                gap_color = "#999"
-            
-            # Calculate impact/relevance indicator
-            attack_pct = r["Attack_Pct"]
-            if pd.notna(yield_val):
-                # Define impact based on attack severity and yield level
-                if attack_pct >= 50 and yield_val < 15:
-                    impact = "🔴 TINGGI"
-                    impact_color = "#e74c3c"
-                elif attack_pct >= 20 and yield_val < 18:
-                    impact = "🟠 SEDANG"
-                    impact_color = "#e67e22"
-                else:
-                    impact = "🟡 RENDAH"
-                    impact_color = "#f1c40f"
-            else:
-                impact = "❓ N/A"
-                impact_color = "#999"
-            
-            # Format yield values
-            yield_real_str = f"{yield_val:.2f}" if pd.notna(yield_val) else "N/A"
-            yield_pot_str = f"{potensi_yield:.2f}" if pd.notna(potensi_yield) else "N/A"
-            gap_yield_str = f"{gap_yield:.2f}" if pd.notna(gap_yield) else "N/A"
-            
-            gano_rows += f'<tr><td>{i}</td><td><b>{blok_prod_name}</b></td><td>{r["Total"]:,} pohon</td><td style="color:#e74c3c">{r["MERAH"]}</td><td style="color:#e67e22">{r["ORANYE"]}</td><td><b>{r["Attack_Pct"]:.1f}%</b></td><td>{luas_str}</td><td>{real_str}</td><td>{pot_str}</td><td style="color:{gap_color}"><b>{gap_prod_str}</b></td><td>{yield_real_str}</td><td>{yield_pot_str}</td><td>{gap_yield_str}</td><td>{umur_str}</td><td style="color:{impact_color}"><b>{impact}</b></td></tr>'
+        block_stats = results[view]['block_stats']
+        top_gano = block_stats.iloc[top_n_positions(block_stats['Attack_Pct'], 10)]
+        top_gano = top_gano.assign(Rank=np.arange(1, len(top_gano) + 1),
+                                   Blok_Key=top_gano['Blok'].map(convert_prod_to_gano_pattern))
+        
+        # FIXED: Match via normalized key (B16 ↔ B016A); blok tanpa match umur produktif di-skip
+        pov1 = top_gano.join(prod_metrics, on='Blok_Key', how='inner')
+        
+        # Color code gap production (red if big gap >30 Ton, orange 10-30 Ton, green <10 Ton)
+        gap_prod = pov1['Potensi_Prod_Ton'] - pov1['Produksi_Ton']
+        gap_color = np.select([gap_prod > 30, gap_prod > 10, gap_prod.notna()],
+                              ['#e74c3c', '#f39c12', '#27ae60'], '#999')
+        
+        # Impact/relevance indicator based on attack severity and yield level
+        attack_pct = pov1['Attack_Pct']
+        yield_val = pov1['Yield_TonHa']
+        impact_conds = [yield_val.isna(), (attack_pct >= 50) & (yield_val < 15), (attack_pct >= 20) & (yield_val < 18)]
+        impact = np.select(impact_conds, ['❓ N/A', '🔴 TINGGI', '🟠 SEDANG'], '🟡 RENDAH')
+        impact_color = np.select(impact_conds, ['#999', '#e74c3c', '#e67e22'], '#f1c40f')
+        
+        gano_rows = "".join(
+            f'<tr><td>{i}</td><td><b>{blok}</b></td><td>{total:,} pohon</td><td style="color:#e74c3c">{merah}</td><td style="color:#e67e22">{oranye}</td><td><b>{attack:.1f}%</b></td><td>{luas}</td><td>{real}</td><td>{pot}</td><td style="color:{g_color}"><b>{gap}</b></td><td>{y_real}</td><td>{y_pot}</td><td>{y_gap}</td><td>{umur} th</td><td style="color:{i_color}"><b>{imp}</b></td></tr>'
+            for i, blok, total, merah, oranye, attack, luas, real, pot, g_color, gap, y_real, y_pot, y_gap, umur, i_color, imp in zip(
+                pov1['Rank'], pov1['Blok_Prod'], pov1['Total'], pov1['MERAH'], pov1['ORANYE'], attack_pct,
+                format_or_na(pov1['Luas_Ha'], '.1f'), format_or_na(pov1['Produksi_Ton'], '.2f'),
+                format_or_na(pov1['Potensi_Prod_Ton'], '.2f'), gap_color, format_or_na(gap_prod, '.2f'),
+                format_or_na(yield_val, '.2f'), format_or_na(pov1['Potensi_Yield'], '.2f'),
+                format_or_na(pov1['Gap_Yield'], '.2f'), pov1['Umur_Tahun'].astype(int), impact_color, impact
+            )
+        )
         
         # POV 2: Low yield blocks WITH RELEVANT Ganoderma attack (PRODUCTIVE PLANTS ONLY)
         yield_rows = ""
-        if not prod_df.empty:
-            # Filter only productive age (3-25 years) - exclude TBM (<3y) and old plants (>25y)
-            productive_df = prod_df[(prod_df['Umur_Tahun'] >= 3) & (prod_df['Umur_Tahun'] <= 25)]
-            if not productive_df.empty:
-                low_yield = productive_df.nsmallest(20, 'Yield_TonHa')  # Get top 20 candidates
-                
-                # Filter for relevance: only show if attack % > 2% (Ganoderma-related)  
-                relevant_blocks = []
-                for _, r in low_yield.iterrows():
-                    # FIXED: Convert A012A → A12 for matching
-                    gano_pattern = convert_prod_to_gano_pattern(r['Blok_Prod'])
-                    blok_match = block_stats[block_stats['Blok'].str.contains(gano_pattern, na=False, regex=False)]
-                    attack = blok_match['Attack_Pct'].mean() if not blok_match.empty else 0
-                    
-                    # Only include if attack > 2% (relevant to Ganoderma)
-                    # Threshold lowered from 5% to 2% for better coverage
-                    if attack >= 2:
-                        relevant_blocks.append({
-                            'blok': r['Blok_Prod'],
-                            'umur': int(r['Umur_Tahun']) if pd.notna(r['Umur_Tahun']) else 0,
-                            'yield': r['Yield_TonHa'],
-                            'luas': r['Luas_Ha'],
-                            'attack': attack
-                        })
-                
-                # Display top 10 relevant blocks
-                for i, block in enumerate(relevant_blocks[:10], 1):
-                    # Determine relevance strength
-                    if block['attack'] >= 40:
-                        relevance = "🔴 KUAT"
-                        rel_color = "#e74c3c"
-                    elif block['attack'] >= 20:
-                        relevance = "🟠 SEDANG"
-                        rel_color = "#e67e22"
-                    else:
-                        relevance = "🟡 LEMAH"
-                        rel_color = "#f1c40f"
-                    
-                    yield_rows += f'<tr><td>{i}</td><td><b>{block["blok"]}</b></td><td>{block["umur"]} th</td><td>{block["yield"]:.3f}</td><td>{block["luas"]:.1f}</td><td><b>{block["attack"]:.1f}%</b></td><td style="color:{rel_color}"><b>{relevance}</b></td></tr>'
+        if not productive_df.empty:
+            attack_by_key = block_stats.groupby(block_stats['Blok'].map(convert_prod_to_gano_pattern))['Attack_Pct'].mean()
+            low_yield = productive_df.iloc[top_n_positions(productive_df['Yield_TonHa'], 20, largest=False)]  # Get top 20 candidates
+            
+            # FIXED: Match via normalized key (A012A → A12)
+            # Only include if attack > 2% (relevant to Ganoderma); display top 10
+            # Threshold lowered from 5% to 2% for better coverage
+            low_yield = low_yield.assign(Attack=low_yield['Blok_Key'].map(attack_by_key).fillna(0))
+            relevant = low_yield[low_yield['Attack'] >= 2].head(10)
+            
+            # Determine relevance strength
+            rel_conds = [relevant['Attack'] >= 40, relevant['Attack'] >= 20]
+            relevance = np.select(rel_conds, ['🔴 KUAT', '🟠 SEDANG'], '🟡 LEMAH')
+            rel_color = np.select(rel_conds, ['#e74c3c', '#e67e22'], '#f1c40f')
+            
+            yield_rows = "".join(
+                f'<tr><td>{i}</td><td><b>{blok}</b></td><td>{umur} th</td><td>{yld:.3f}</td><td>{luas:.1f}</td><td><b>{attack:.1f}%</b></td><td style="color:{r_color}"><b>{rel}</b></td></tr>'
+                for i, (blok, umur, yld, luas, attack, r_color, rel) in enumerate(zip(
+                    relevant['Blok_Prod'], relevant['Umur_Tahun'].fillna(0).astype(int), relevant['Yield_TonHa'],
+                    relevant['Luas_Ha'], relevant['Attack'], rel_color, relevance
+                ), 1)
+            )
         
-        divisi_tabs += f'<button class="tab {active}" onclick="switchTab(\'{divisi_id}\')" data-div="{divisi_id}">{divisi}</button>'
+        divisi_tabs.append(f'<button class="tab {active}" onclick="switchTab(\'{divisi_id}\')" data-div="{divisi_id}">{divisi}</button>')
         
-        divisi_content += f'''
+        divisi_content.append(f'''
         <div class="content {active}" id="{divisi_id}">
             <div class="header-info"><h2>📍 {divisi}</h2><span>🌳 {results["standar"]["total"]:,} pohon | 📦 {results["standar"]["blocks"]} blok</span></div>
             
             <div class="stats-grid">
-                <div class="stat-card merah"><div class="val">{stats["MERAH"]:,}</div><div class="lbl">🔴 MERAH</div></div>
-                <div class="stat-card oranye"><div class="val">{stats["ORANYE"]:,}</div><div class="lbl">🟠 ORANYE</div></div>
-                <div class="stat-card kuning"><div class="val">{stats["KUNING"]:,}</div><div class="lbl">🟡 KUNING</div></div>
-                <div class="stat-card hijau"><div class="val">{stats["HIJAU"]:,}</div><div class="lbl">🟢 HIJAU</div></div>
+                <div class="stat-card merah"><div class="val" id="merah-{divisi_id}">{stats["MERAH"]:,}</div><div class="lbl">🔴 MERAH</div></div>
+                <div class="stat-card oranye"><div class="val" id="oranye-{divisi_id}">{stats["ORANYE"]:,}</div><div class="lbl">🟠 ORANYE</div></div>
+                <div class="stat-card kuning"><div class="val" id="kuning-{divisi_id}">{stats["KUNING"]:,}</div><div class="lbl">🟡 KUNING</div></div>
+                <div class="stat-card hijau"><div class="val" id="hijau-{divisi_id}">{stats["HIJAU"]:,}</div><div class="lbl">🟢 HIJAU</div></div>
             </div>
             
             <section><h3>📊 Perbandingan Preset</h3><div class="preset-grid">{preset_cards}</div></section>
@@ -524,10 +1011,74 @@ def generate_html(output_dir, all_results, all_maps, prod_df):
                 <table><thead><tr><th>#</th><th>Blok</th><th>Umur</th><th>Yield</th><th>Luas</th><th>% Attack</th><th>Relevansi</th></tr></thead>
                 <tbody>{yield_rows if yield_rows else "<tr><td colspan='7'>Tidak ada blok dengan yield rendah + serangan signifikan</td></tr>"}</tbody></table>
             </section>
-        </div>'''
+        </div>''')
     
-    html = f'''<!DOCTYPE html>
-<html><head><meta charset="UTF-8"><title>Dashboard Z-Score + Cincin Api v7.0 FIXED</title>
+    if preset is None:
+        config_panel = '''    <!-- Configuration Panel -->
+    <div class="config-panel">
+        <div class="config-header">
+            <h3>⚙️ KONFIGURASI THRESHOLD Z-SCORE</h3>
+            <button class="info-btn" onclick="openInfoModal()" title="Bantuan">❓</button>
+        </div>
+        <div class="config-grid">
+            <div class="config-item">
+                <label>📋 Preset Strategi:</label>
+                <select id="preset-select" onchange="applyPreset()">
+                    <option value="konservatif">Konservatif (Lebih Banyak MERAH)</option>
+                    <option value="standar" selected>Standar (Balanced)</option>
+                    <option value="agresif">Agresif (Lebih Selektif)</option>
+                    <option value="custom">Custom (Manual)</option>
+                </select>
+            </div>
+            
+            <div class="config-item">
+                <label>🎯 Z-Score Core (Kluster Aktif):</label>
+                <input type="range" id="z-core" min="-3" max="0" step="0.1" value="-1.5" oninput="updateConfig()">
+                <div class="value-display">
+                    <span>Z-Score:</span>
+                    <span id="z-core-val">-1.5</span>
+                </div>
+                <div class="impact">💡 Semakin tinggi → Lebih banyak pohon dianggap MERAH</div>
+            </div>
+            
+            <div class="config-item">
+                <label>🔗 Z-Score Neighbor (Tetangga Terpengaruh):</label>
+                <input type="range" id="z-neighbor" min="-2" max="0" step="0.1" value="-0.5" oninput="updateConfig()">
+                <div class="value-display">
+                    <span>Z-Score:</span>
+                    <span id="z-neighbor-val">-0.5</span>
+                </div>
+                <div class="impact">💡 Semakin tinggi → ORANYE (Cincin Api) lebih luas</div>
+            </div>
+            
+            <div class="config-item">
+                <label>👥 Min Neighbors (Tetangga Minimum):</label>
+                <input type="range" id="min-neighbors" min="1" max="6" step="1" value="2" oninput="updateConfig()">
+                <div class="value-display">
+                    <span>Jumlah:</span>
+                    <span id="min-neighbors-val">2</span>
+                </div>
+                <div class="impact">💡 Semakin rendah → Lebih sensitif deteksi kluster</div>
+            </div>
+        </div>
+    </div>
+    
+'''
+        title = 'Dashboard Z-Score + Cincin Api v7.0 FIXED'
+    else:
+        c = ZSCORE_PRESETS[preset]
+        config_panel = f'''    <div class="config-panel">
+        <div class="config-header"><h3>📋 PRESET {preset.upper()} (STATIS)</h3></div>
+        <p>{c["description"]} | Z-Score Core &lt; {c["z_threshold_core"]} | Z-Score Neighbor &lt; {c["z_threshold_neighbor"]} | Min Neighbors ≥ {c["min_stressed_neighbors"]}
+        | <a href="index.html" style="color:#00d9ff">Semua preset</a> | <a href="dashboard_v7_fixed.html" style="color:#00d9ff">Versi interaktif</a></p>
+    </div>
+    
+'''
+        title = f'Dashboard Z-Score + Cincin Api v7.0 FIXED - {preset.upper()}'
+    
+    # Template dipecah di titik fragmen dinamis: head -> tabs -> konten divisi -> footer+JS
+    html_head = f'''<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>{title}</title>
 <style>
 :root {{ --merah:#e74c3c; --oranye:#e67e22; --kuning:#f1c40f; --hijau:#27ae60; --dark:#1a1a2e; }}
 * {{ margin:0; padding:0; box-sizing:border-box; }}
@@ -601,60 +1152,14 @@ tr:hover {{ background:rgba(255,255,255,0.05); }}
 <body>
 <div class="header"><h1>🔥 DASHBOARD Z-SCORE + CINCIN API v7.0 FIXED</h1><p>Hybrid Detection • Korelasi Produktivitas DIPERBAIKI</p></div>
 <div class="container">
-    <!-- Configuration Panel -->
-    <div class="config-panel">
-        <div class="config-header">
-            <h3>⚙️ KONFIGURASI THRESHOLD Z-SCORE</h3>
-            <button class="info-btn" onclick="openInfoModal()" title="Bantuan">❓</button>
-        </div>
-        <div class="config-grid">
-            <div class="config-item">
-                <label>📋 Preset Strategi:</label>
-                <select id="preset-select" onchange="applyPreset()">
-                    <option value="konservatif">Konservatif (Lebih Banyak MERAH)</option>
-                    <option value="standar" selected>Standar (Balanced)</option>
-                    <option value="agresif">Agresif (Lebih Selektif)</option>
-                    <option value="custom">Custom (Manual)</option>
-                </select>
-            </div>
-            
-            <div class="config-item">
-                <label>🎯 Z-Score Core (Kluster Aktif):</label>
-                <input type="range" id="z-core" min="-3" max="0" step="0.1" value="-1.5" oninput="updateConfig()">
-                <div class="value-display">
-                    <span>Z-Score:</span>
-                    <span id="z-core-val">-1.5</span>
-                </div>
-                <div class="impact">💡 Semakin tinggi → Lebih banyak pohon dianggap MERAH</div>
-            </div>
-            
-            <div class="config-item">
-                <label>🔗 Z-Score Neighbor (Tetangga Terpengaruh):</label>
-                <input type="range" id="z-neighbor" min="-2" max="0" step="0.1" value="-0.5" oninput="updateConfig()">
-                <div class="value-display">
-                    <span>Z-Score:</span>
-                    <span id="z-neighbor-val">-0.5</span>
-                </div>
-                <div class="impact">💡 Semakin tinggi → ORANYE (Cincin Api) lebih luas</div>
-            </div>
-            
-            <div class="config-item">
-                <label>👥 Min Neighbors (Tetangga Minimum):</label>
-                <input type="range" id="min-neighbors" min="1" max="6" step="1" value="2" oninput="updateConfig()">
-                <div class="value-display">
-                    <span>Jumlah:</span>
-                    <span id="min-neighbors-val">2</span>
-                </div>
-                <div class="impact">💡 Semakin rendah → Lebih sensitif deteksi kluster</div>
-            </div>
-        </div>
-    </div>
+{config_panel}<div class="tabs">'''
     
-<div class="tabs">{divisi_tabs}</div>
-{divisi_content}
+    html_footer = f'''
 <div class="footer">Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</div>
 </div>
-
+'''
+    
+    html_script = f'''
 <!-- Info Modal -->
 <div id="infoModal" class="modal">
     <div class="modal-content">
@@ -703,7 +1208,22 @@ tr:hover {{ background:rgba(255,255,255,0.05); }}
 <script>
 // Global data
 const PRESETS = {presets_json};
-const DIVISI_DATA = {js_data_json};
+const PRESET_COUNTS = {preset_counts_json};
+const DIVISI_DATA = '''
+    
+    # Halaman statis: cukup pindah tab divisi
+    html_static_script = '''
+<script>
+function switchTab(id) {
+    document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+    document.querySelectorAll('.content').forEach(c => c.classList.remove('active'));
+    document.querySelector(`[data-div="${id}"]`).classList.add('active');
+    document.getElementById(id).classList.add('active');
+}
+</script>
+</body></html>'''
+    
+    html_tail = f''';
 let currentDivisi = '{list(all_results.keys())[0].replace(" ", "_")}';
 
 // Preset management
@@ -718,6 +1238,16 @@ function applyPreset() {{
     updateConfig();
 }}
 
+// Key kanonik (threshold x10 dibulatkan ke integer) -> nama preset, lookup O(1) tanpa epsilon compare
+function presetKey(zCore, zNeighbor, minNeighbors) {{
+    return `${{Math.round(zCore * 10)}}_${{Math.round(zNeighbor * 10)}}_${{minNeighbors}}`;
+}}
+const PRESET_KEY = new Map(Object.entries(PRESETS).map(([name, c]) =>
+    [presetKey(c.z_threshold_core, c.z_threshold_neighbor, c.min_stressed_neighbors), name]));
+
+// Rekalkulasi dijadwalkan maksimal sekali per frame (requestAnimationFrame) selama slider di-drag
+let recalcPending = false;
+
 function updateConfig() {{
     const zCore = parseFloat(document.getElementById('z-core').value);
     const zNeighbor = parseFloat(document.getElementById('z-neighbor').value);
@@ -729,115 +1259,183 @@ function updateConfig() {{
     document.getElementById('min-neighbors-val').textContent = minNeighbors;
     
     // Auto-detect preset match
-    let matchedPreset = null;
-    for (const [name, config] of Object.entries(PRESETS)) {{
-        if (Math.abs(config.z_threshold_core - zCore) < 0.01 && 
-            Math.abs(config.z_threshold_neighbor - zNeighbor) < 0.01 && 
-            config.min_stressed_neighbors === minNeighbors) {{
-            matchedPreset = name;
-            break;
-        }}
-    }}
+    const matchedPreset = PRESET_KEY.get(presetKey(zCore, zNeighbor, minNeighbors)) || null;
     document.getElementById('preset-select').value = matchedPreset || 'custom';
     
-    // Recalculate for current divisi
-    recalculateStats(currentDivisi, zCore, zNeighbor, minNeighbors);
+    // Preset baku: jumlah sudah dihitung Python, tidak perlu rekalkulasi
+    if (matchedPreset) {{
+        renderCounts(currentDivisi, PRESET_COUNTS[matchedPreset][currentDivisi]);
+        return;
+    }}
+    
+    // Recalculate for current divisi - nilai slider dibaca ulang saat frame dieksekusi
+    if (recalcPending) return;
+    recalcPending = true;
+    requestAnimationFrame(() => {{
+        recalcPending = false;
+        recalculateStats(currentDivisi,
+            parseFloat(document.getElementById('z-core').value),
+            parseFloat(document.getElementById('z-neighbor').value),
+            parseInt(document.getElementById('min-neighbors').value));
+    }});
+}}
+
+// Decode kolom base64 (bytes little-endian dari Python) langsung menjadi typed array
+function decodeColumn(b64, ArrayType) {{
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new ArrayType(bytes.buffer);
+}}
+
+// Kolom SoA (typed array) per divisi, didecode sekali dari payload biner
+function getColumns(data) {{
+    if (!data._columns) {{
+        const c = data.cols;
+        const zscore10 = decodeColumn(c.ZScore10, Int8Array);
+        data._columns = {{
+            n: zscore10.length,
+            blok: decodeColumn(c.Blok, Uint16Array),
+            baris: decodeColumn(c.N_BARIS, Int16Array),
+            pokok: decodeColumn(c.N_POKOK, Int16Array),
+            zscore10: zscore10
+        }};
+    }}
+    return data._columns;
+}}
+
+// Jumlah status dari tabel prekomputasi Python (semua kombinasi slider); null jika tidak tersedia
+function lookupGridCounts(data, zCore, zNeighbor, minNeighbors) {{
+    const g = data.grid;
+    if (!g) return null;
+    const idx = (values, v) => {{
+        const i = Math.round((v - values[0]) / (values[1] - values[0]));
+        return (i >= 0 && i < values.length && Math.abs(values[i] - v) < 1e-6) ? i : -1;
+    }};
+    const a = idx(g.z_core, zCore), b = idx(g.z_neighbor, zNeighbor), m = g.min_neighbors.indexOf(minNeighbors);
+    if (a < 0 || b < 0 || m < 0) return null;
+    const base = ((a * g.z_neighbor.length + b) * g.min_neighbors.length + m) * g.labels.length;
+    const counts = {{}};
+    g.labels.forEach((label, k) => counts[label] = g.counts[base + k]);
+    return counts;
+}}
+
+// Cache LRU hasil klasifikasi live per (divisi, zCore, zNeighbor, minNeighbors); Map menjaga urutan sisip
+const STATS_CACHE = new Map();
+const STATS_CACHE_SIZE = 16;
+
+function cachedClassify(divisiId, data, zCore, zNeighbor, minNeighbors) {{
+    const key = `${{divisiId}}|${{zCore.toFixed(1)}}|${{zNeighbor.toFixed(1)}}|${{minNeighbors}}`;
+    let counts = STATS_CACHE.get(key);
+    if (counts) {{
+        STATS_CACHE.delete(key);  // refresh posisi -> paling baru
+    }} else {{
+        counts = classifyTrees(data, zCore, zNeighbor, minNeighbors);
+        if (STATS_CACHE.size >= STATS_CACHE_SIZE) STATS_CACHE.delete(STATS_CACHE.keys().next().value);
+    }}
+    STATS_CACHE.set(key, counts);
+    return counts;
 }}
 
 function recalculateStats(divisiId, zCore, zNeighbor, minNeighbors) {{
     const data = DIVISI_DATA[divisiId];
     if (!data) return;
+    const counts = lookupGridCounts(data, zCore, zNeighbor, minNeighbors)
+        || cachedClassify(divisiId, data, zCore, zNeighbor, minNeighbors);
     
-    let merah = 0, oranye = 0, kuning = 0, hijau = 0;
-    const statusMap = new Map();
-    const coordLookup = new Map();
-    
-    // Build coordinate lookup
-    for (const tree of data.trees) {{
-        const key = `${{tree.Blok}}_${{tree.N_BARIS}}_${{tree.N_POKOK}}`;
-        coordLookup.set(key, tree);
-    }}
-    
-    // Step 1 & 2: Identify suspects based on Z-Score
-    const suspects = [];
-    for (const tree of data.trees) {{
-        const key = `${{tree.Blok}}_${{tree.N_BARIS}}_${{tree.N_POKOK}}`;
-        
-        if (tree.ZScore < zCore) {{
-            suspects.push(tree);
-            statusMap.set(key, 'SUSPECT');
-        }} else {{
-            statusMap.set(key, 'HIJAU');
-            hijau++;
+    renderCounts(divisiId, counts);
+}}
+
+function renderCounts(divisiId, counts) {{
+    document.getElementById(`merah-${{divisiId}}`).textContent = counts.merah.toLocaleString();
+    document.getElementById(`oranye-${{divisiId}}`).textContent = counts.oranye.toLocaleString();
+    document.getElementById(`kuning-${{divisiId}}`).textContent = counts.kuning.toLocaleString();
+    document.getElementById(`hijau-${{divisiId}}`).textContent = counts.hijau.toLocaleString();
+}}
+
+// Offset tetangga hex [dBaris, dPokok] x 6, diindeks paritas baris (baris & 1) - tanpa cabang/alokasi per pohon
+const HEX_OFFSETS = [
+    new Int8Array([-1, -1, -1, 0, 0, -1, 0, 1, 1, -1, 1, 0]),
+    new Int8Array([-1, 0, -1, 1, 0, -1, 0, 1, 1, 0, 1, 1])
+];
+
+// Grid Int32Array per blok (indeks pohon, -1 = kosong) - dibangun sekali per divisi, bukan per gerakan slider
+function getBlockGrids(data) {{
+    if (!data._blockGrids) {{
+        const col = getColumns(data);
+        const grids = data.blocks.map(([b0, p0, rows, cols]) => ({{ b0, p0, cols, cells: new Int32Array(rows * cols).fill(-1) }}));
+        for (let i = 0; i < col.n; i++) {{
+            const g = grids[col.blok[i]];
+            g.cells[(col.baris[i] - g.b0) * g.cols + (col.pokok[i] - g.p0)] = i;
         }}
+        data._blockGrids = grids;
+    }}
+    return data._blockGrids;
+}}
+
+// Klasifikasi live di browser (fallback untuk nilai di luar tabel prekomputasi)
+function classifyTrees(data, zCore, zNeighbor, minNeighbors) {{
+    const {{ n, blok, baris, pokok, zscore10 }} = getColumns(data);
+    // Threshold di skala int8 ZScore10 (slider step 0.1 -> integer eksak)
+    const zCore10 = Math.round(zCore * 10), zNeighbor10 = Math.round(zNeighbor * 10);
+    const grids = getBlockGrids(data);
+    // Buffer kerja dialokasikan sekali per divisi dan dipakai ulang tiap rekalkulasi (tanpa churn GC)
+    if (!data._scratch) {{
+        data._scratch = {{ status: new Uint8Array(n), weak: new Uint8Array(n), suspects: new Int32Array(n) }};
+    }}
+    const {{ status, weak, suspects }} = data._scratch;
+    // Kode status per pohon: 0=HIJAU, 1=KUNING, 2=MERAH, 3=ORANYE
+    status.fill(0);
+    
+    // Step 1 & 2: Identify suspects based on Z-Score - satu sweep tanpa cabang (unroll 4):
+    // mask tetangga-stres 1 byte/pohon (ditimpa penuh) dan daftar suspect padat
+    let nSuspect = 0;
+    let t = 0;
+    for (; t + 4 <= n; t += 4) {{
+        const z0 = zscore10[t], z1 = zscore10[t + 1], z2 = zscore10[t + 2], z3 = zscore10[t + 3];
+        weak[t] = z0 < zNeighbor10;
+        weak[t + 1] = z1 < zNeighbor10;
+        weak[t + 2] = z2 < zNeighbor10;
+        weak[t + 3] = z3 < zNeighbor10;
+        suspects[nSuspect] = t;     nSuspect += z0 < zCore10;
+        suspects[nSuspect] = t + 1; nSuspect += z1 < zCore10;
+        suspects[nSuspect] = t + 2; nSuspect += z2 < zCore10;
+        suspects[nSuspect] = t + 3; nSuspect += z3 < zCore10;
+    }}
+    for (; t < n; t++) {{
+        weak[t] = zscore10[t] < zNeighbor10;
+        suspects[nSuspect] = t; nSuspect += zscore10[t] < zCore10;
     }}
     
-    // Step 3 & 4: Count neighbors and classify MERAH/KUNING
-    for (const tree of suspects) {{
-        const key = `${{tree.Blok}}_${{tree.N_BARIS}}_${{tree.N_POKOK}}`;
-        const neighbors = getHexNeighbors(tree.N_BARIS, tree.N_POKOK);
-        
+    // Step 3-5 (satu pass): hitung tetangga stres, klasifikasi MERAH/KUNING, dan langsung
+    // tandai tetangga MERAH sebagai ORANYE. Prioritas MERAH > ORANYE > KUNING > HIJAU:
+    // KUNING memakai |= 1 sehingga pohon yang sudah ORANYE (3) tetap ORANYE
+    const nbIdx = new Int32Array(6);
+    for (let s = 0; s < nSuspect; s++) {{
+        const i = suspects[s];
+        const g = grids[blok[i]];
+        const off = HEX_OFFSETS[baris[i] & 1];
+        const b = baris[i] - g.b0, p = pokok[i] - g.p0;
         let sickCount = 0;
-        for (const [nb, np] of neighbors) {{
-            const nKey = `${{tree.Blok}}_${{nb}}_${{np}}`;
-            const neighbor = coordLookup.get(nKey);
-            if (neighbor && neighbor.ZScore < zNeighbor) {{
-                sickCount++;
-            }}
-        }}
-        
-        if (sickCount >= minNeighbors) {{
-            statusMap.set(key, 'MERAH');
-            merah++;
-        }} else {{
-            statusMap.set(key, 'KUNING');
-            kuning++;
+        for (let k = 0; k < 6; k++) {{
+            const idx = g.cells[(b + off[2 * k]) * g.cols + (p + off[2 * k + 1])];
+            nbIdx[k] = idx;
+            if (idx >= 0) sickCount += weak[idx];
         }}
-    }}
-    
-    // Step 5: Create Cincin Api (ORANYE)
-    const merahTrees = [];
-    for (const [key, status] of statusMap.entries()) {{
-        if (status === 'MERAH') {{
-            const [blok, baris, pokok] = key.split('_');
-            merahTrees.push({{ blok, baris: parseInt(baris), pokok: parseInt(pokok) }});
+        if (sickCount < minNeighbors) {{
+            status[i] |= 1;
+            continue;
         }}
-    }}
-    
-    for (const tree of merahTrees) {{
-        const neighbors = getHexNeighbors(tree.baris, tree.pokok);
-        for (const [nb, np] of neighbors) {{
-            const nKey = `${{tree.blok}}_${{nb}}_${{np}}`;
-            if (statusMap.has(nKey) && statusMap.get(nKey) !== 'MERAH') {{
-                const oldStatus = statusMap.get(nKey);
-                statusMap.set(nKey, 'ORANYE');
-                
-                if (oldStatus === 'HIJAU') hijau--;
-                else if (oldStatus === 'KUNING') kuning--;
-                oranye++;
-            }}
+        status[i] = 2;
+        for (let k = 0; k < 6; k++) {{
+            const idx = nbIdx[k];
+            if (idx >= 0 && status[idx] !== 2) status[idx] = 3;
         }}
     }}
     
-    // Update UI
-    document.getElementById(`merah-${{divisiId}}`).textContent = merah.toLocaleString();
-    document.getElementById(`oranye-${{divisiId}}`).textContent = oranye.toLocaleString();
-    document.getElementById(`kuning-${{divisiId}}`).textContent = kuning.toLocaleString();
-    document.getElementById(`hijau-${{divisiId}}`).textContent = hijau.toLocaleString();
-}}
-
-function getHexNeighbors(baris, pokok) {{
-    if (baris % 2 === 0) {{
-        return [
-            [baris-1, pokok-1], [baris-1, pokok], [baris, pokok-1],
-            [baris, pokok+1], [baris+1, pokok-1], [baris+1, pokok]
-        ];
-    }} else {{
-        return [
-            [baris-1, pokok], [baris-1, pokok+1], [baris, pokok-1],
-            [baris, pokok+1], [baris+1, pokok], [baris+1, pokok+1]
-        ];
-    }}
+    const counts = [0, 0, 0, 0];
+    for (let i = 0; i < n; i++) counts[status[i]]++;
+    return {{ hijau: counts[0], kuning: counts[1], merah: counts[2], oranye: counts[3] }};
 }}
 
 function switchTab(id) {{
@@ -865,11 +1463,50 @@ window.onclick = function(event) {{
 </script>
 </body></html>'''
     
-    path = output_dir / 'dashboard_v7_fixed.html'
+    path = output_dir / ('dashboard_v7_fixed.html' if preset is None else f'dashboard_{preset}.html')
     with open(path, 'w', encoding='utf-8') as f:
-        f.write(html)
+        f.write(html_head)
+        f.write(''.join(divisi_tabs))
+        f.write('</div>\n')
+        f.writelines(divisi_content)
+        f.write(html_footer)
+        if preset is None:
+            f.write(html_script)
+            # Payload data pohon (multi-MB) di-stream langsung ke file
+            json.dump(js_divisi_data, f, separators=(',', ':'))
+            f.write(html_tail)
+        else:
+            f.write(html_static_script)
+    
+    write_precompressed(path)
     return path
 
+def generate_static_dashboards(output_dir, all_results, all_maps, prod_df):
+    """Render halaman statis per preset (dashboard_<preset>.html) + index.html yang menautkan semuanya."""
+    pages = {p: generate_html(output_dir, all_results, all_maps, prod_df, preset=p) for p in ZSCORE_PRESETS}
+    
+    links = "".join(
+        f'<li><a href="{path.name}"><b>{p.upper()}</b></a> - {ZSCORE_PRESETS[p]["description"]}</li>'
+        for p, path in pages.items()
+    )
+    index_path = output_dir / 'index.html'
+    index_path.write_text(f'''<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>Dashboard Z-Score + Cincin Api v7.0 FIXED</title>
+<style>
+body {{ font-family:'Segoe UI',sans-serif; background:linear-gradient(135deg,#1a1a2e,#16213e); color:#fff; min-height:100vh; padding:40px; }}
+h1 {{ color:#ffa500; margin-bottom:20px; }}
+li {{ margin:12px 0; }}
+a {{ color:#00d9ff; }}
+</style></head>
+<body>
+<h1>🔥 DASHBOARD Z-SCORE + CINCIN API v7.0 FIXED</h1>
+<h3>Halaman statis per preset</h3>
+<ul>{links}</ul>
+<h3>Interaktif</h3>
+<ul><li><a href="dashboard_v7_fixed.html"><b>Dashboard dengan slider threshold</b></a></li></ul>
+</body></html>''', encoding='utf-8')
+    return index_path
+
 def main():
     print('='*70)
     print('🔥 DASHBOARD Z-SCORE + CINCIN API + YIELD v7.0 FIXED')
@@ -877,12 +1514,15 @@ def main():
     
     base_dir = Path(__file__).parent
     
+    path_ii = base_dir / 'data/input/tabelNDREnew.csv'
+    path_iv = base_dir / 'data/input/AME_IV.csv'
+    
     print('\n[1/5] Loading AME II...')
-    df_ii = load_and_clean_data(base_dir / 'data/input/tabelNDREnew.csv')
+    df_ii = load_tree_data_cached(load_and_clean_data, path_ii)
     print(f'  ✅ {len(df_ii):,} pohon')
     
     print('\n[2/5] Loading AME IV...')
-    df_iv = load_ame_iv_data(base_dir / 'data/input/AME_IV.csv')
+    df_iv = load_tree_data_cached(load_ame_iv_data, path_iv)
     print(f'  ✅ {len(df_iv):,} pohon')
     
     print('\n[3/5] Loading productivity data...')
@@ -893,21 +1533,29 @@ def main():
     all_maps = {}
     
     print('\n[4/5] Analyzing with Hybrid Cincin Api + Z-Score...')
-    results_ii, maps_ii = analyze_divisi(df_ii, 'AME II', prod_df, output_dir)
-    all_results['AME II'] = {'results': results_ii}
-    all_maps['AME II'] = maps_ii
-    
-    results_iv, maps_iv = analyze_divisi(df_iv, 'AME IV', prod_df, output_dir)
-    all_results['AME IV'] = {'results': results_iv}
-    all_maps['AME IV'] = maps_iv
+    # Kedua divisi dianalisis bersamaan (thread; kernel numba nogil) dan berbagi
+    # satu process pool untuk render peta
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as pool, \
+            ThreadPoolExecutor(max_workers=2) as divisi_pool:
+        futures = {
+            name: divisi_pool.submit(analyze_divisi, df, name, prod_df, output_dir, pool=pool,
+                                     data_digest=file_digest(path))
+            for name, df, path in [('AME II', df_ii, path_ii), ('AME IV', df_iv, path_iv)]
+        }
+        for name, future in futures.items():
+            results, maps = future.result()
+            all_results[name] = {'results': results}
+            all_maps[name] = maps
     
     print('\n[5/5] Generating HTML Dashboard...')
     html_path = generate_html(output_dir, all_results, all_maps, prod_df)
+    index_path = generate_static_dashboards(output_dir, all_results, all_maps, prod_df)
     
     print(f'\n{"="*70}')
     print(f'✅ DASHBOARD v6.0 SELESAI!')
     print(f'📁 Output: {output_dir}')
     print(f'🌐 Dashboard: {html_path}')
+    print(f'📄 Preset statis: {index_path}')
     print('='*70)
     
     return html_path
@@ -4,7 +4,7 @@ Dashboard Z-Score Multi-Divisi v5.0
 Fitur:
 1. Z-Score Spatial Filter untuk deteksi Ganoderma
 2. Tabs terpisah AME II dan AME IV
-3. Peta kluster matplotlib (PNG) - seperti dashboard lama
+3. Peta kluster matplotlib (WebP) - seperti dashboard lama
 4. Real-time recalculation untuk stats dan chart via JavaScript
 5. Integrasi data produktivitas
 """
@@ -17,7 +17,10 @@ from pathlib import Path
 from datetime import datetime
 import json
 import base64
+import io
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
@@ -28,29 +31,38 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 from src.ingestion import load_and_clean_data
 from config import ZSCORE_PRESETS
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    # Numba opsional - fallback ke jalur NumPy
+    HAS_NUMBA = False
+
 # Output
 timestamp = datetime.now().strftime("%Y%m%d_%H%M")
 output_dir = Path(f'data/output/dashboard_zscore_multi_{timestamp}')
 output_dir.mkdir(parents=True, exist_ok=True)
 
+# Kolom AME IV (nama asli -> nama standar); kolom lain di CSV tidak dipakai dashboard
+AME_IV_COLUMN_MAPPING = {
+    'DIVISI': 'Divisi',
+    'blok': 'Blok',
+    'n_baris': 'N_BARIS',
+    'n_pokok': 'N_POKOK',
+    'ndre125': 'NDRE125'
+}
+
 def load_ame_iv_data(file_path):
     """Load AME IV data with semicolon delimiter."""
-    # AME_IV.csv uses semicolon delimiter
-    df = pd.read_csv(file_path, sep=';')
+    # AME_IV.csv uses semicolon delimiter; hanya kolom yang dipakai yang di-parse
+    wanted = set(AME_IV_COLUMN_MAPPING) | set(AME_IV_COLUMN_MAPPING.values())
+    df = pd.read_csv(file_path, sep=';', usecols=lambda col: col in wanted)
     
     # Check if columns are already correct
     logging.info(f"AME IV columns: {df.columns.tolist()[:10]}")
     
     # Rename columns to match expected format
-    column_mapping = {
-        'DIVISI': 'Divisi',
-        'blok': 'Blok',
-        'n_baris': 'N_BARIS', 
-        'n_pokok': 'N_POKOK',
-        'ndre125': 'NDRE125'
-    }
-    
-    for old, new in column_mapping.items():
+    for old, new in AME_IV_COLUMN_MAPPING.items():
         if old in df.columns and new not in df.columns:
             df.rename(columns={old: new}, inplace=True)
     
@@ -68,138 +80,180 @@ def load_ame_iv_data(file_path):
     
     df = df.dropna(subset=['Blok', 'N_BARIS', 'N_POKOK', 'NDRE125'])
     
+    # Downcast: baris/pokok ke integer terkecil yang muat (tanpa wrap bila ada nilai di luar int16),
+    # NDRE125 float32, Blok kategorikal (groupby atas kode integer)
+    for col in ['N_BARIS', 'N_POKOK']:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    df = df.astype({'NDRE125': np.float32, 'Blok': 'category'})
+    
     logging.info(f"Loaded AME IV: {len(df):,} trees")
     return df
 
-def calculate_zscore_detection(df, z_core=-1.5, z_neighbor=-0.5, min_neighbors=1):
+# Urutan kategori Status (kode 0-3)
+STATUS_CATEGORIES = ['HIJAU', 'KUNING', 'ORANYE', 'MERAH']
+
+# Offset jendela 3x3 (d_baris, d_pokok), termasuk pohon itu sendiri
+WINDOW_OFFSETS = [(db, dp) for db in (-1, 0, 1) for dp in (-1, 0, 1)]
+
+def prepare_zscores(df):
     """
-    Calculate Z-Score based Ganoderma detection.
-    Returns DataFrame with Status column.
+    Z-Score per pohon + posisi tiap pohon di grid padat per blok. Tidak bergantung threshold,
+    jadi cukup dihitung sekali per divisi lalu dipakai classify_zscores untuk semua preset.
+    Tiap blok mendapat persegi (baris x pokok) dengan padding 1 sel, sehingga offset +-1
+    selalu jatuh di grid blok itu sendiri.
+    Return dict: df (dengan Mean_NDRE/SD_NDRE/ZScore), cell, width, n_cells.
     """
-    df = df.copy()
+    df = df.reset_index(drop=True)
     
-    # Calculate block statistics
-    block_stats = df.groupby('Blok')['NDRE125'].agg(['mean', 'std']).reset_index()
-    block_stats.columns = ['Blok', 'Mean_NDRE', 'SD_NDRE']
-    block_stats['SD_NDRE'] = block_stats['SD_NDRE'].fillna(1).replace(0, 1)
-    
-    # Merge and calculate Z-Score
-    df = df.merge(block_stats, on='Blok', how='left')
+    # Block statistics langsung sejajar per pohon (transform, tanpa tabel antara + merge)
+    # (akumulasi float64 walau NDRE125 disimpan float32)
+    ndre_by_blok = df['NDRE125'].astype(np.float64).groupby(df['Blok'], sort=False, observed=True)
+    df['Mean_NDRE'] = ndre_by_blok.transform('mean')
+    df['SD_NDRE'] = ndre_by_blok.transform('std').fillna(1).replace(0, 1)
     df['ZScore'] = (df['NDRE125'] - df['Mean_NDRE']) / df['SD_NDRE']
-    df['Is_Core'] = df['ZScore'] < z_core
     
-    # Count stressed neighbors per tree
-    df['Stressed_Neighbors'] = 0
-    df['Status'] = 'HIJAU'
+    # Grid per blok: bounding box -> offset blok di array datar
+    blok_id = df.groupby('Blok', sort=False, observed=True).ngroup().to_numpy()
+    n_blok = blok_id.max() + 1 if len(df) else 0
+    baris = df['N_BARIS'].to_numpy(dtype=np.int64)
+    pokok = df['N_POKOK'].to_numpy(dtype=np.int64)
+    bmin = np.full(n_blok, np.iinfo(np.int64).max)
+    bmax = np.full(n_blok, np.iinfo(np.int64).min)
+    pmin = bmin.copy()
+    pmax = bmax.copy()
+    np.minimum.at(bmin, blok_id, baris)
+    np.maximum.at(bmax, blok_id, baris)
+    np.minimum.at(pmin, blok_id, pokok)
+    np.maximum.at(pmax, blok_id, pokok)
     
-    for blok in df['Blok'].unique():
-        block_mask = df['Blok'] == blok
-        block_df = df[block_mask].copy()
-        block_indices = df[block_mask].index
-        
-        for idx in block_indices:
-            if not df.loc[idx, 'Is_Core']:
+    widths = pmax - pmin + 3
+    sizes = (bmax - bmin + 3) * widths
+    base = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    width = widths[blok_id]
+    cell = base[blok_id] + (baris - bmin[blok_id] + 1) * width + (pokok - pmin[blok_id] + 1)
+    
+    return {'df': df, 'cell': cell, 'width': width, 'n_cells': int(sizes.sum())}
+
+if HAS_NUMBA:
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def count_stressed_neighbors(cell, width, zscore, z_core, z_neighbor, n_cells):
+        """
+        Jumlah pohon stres di jendela 3x3 (tanpa diri sendiri, minimal 0) untuk pohon core.
+        Serial (tanpa parallel=True): thread pool numba yang sudah jalan membuat proses
+        utama macet saat exit setelah ProcessPoolExecutor fork worker render peta.
+        """
+        n = cell.shape[0]
+        grid = np.zeros(n_cells, np.int32)
+        for i in range(n):
+            if zscore[i] < z_neighbor:
+                grid[cell[i]] += 1
+        counts = np.zeros(n, np.int64)
+        for i in range(n):
+            if not zscore[i] < z_core:
                 continue
-            
-            baris = df.loc[idx, 'N_BARIS']
-            pokok = df.loc[idx, 'N_POKOK']
-            
-            # Find neighbors (3x3 grid around the tree)
-            neighbor_mask = (
-                (block_df['N_BARIS'] >= baris - 1) & 
-                (block_df['N_BARIS'] <= baris + 1) &
-                (block_df['N_POKOK'] >= pokok - 1) & 
-                (block_df['N_POKOK'] <= pokok + 1) &
-                (block_df['ZScore'] < z_neighbor)
-            )
-            
-            stressed_count = neighbor_mask.sum() - 1  # Exclude self
-            stressed_count = max(0, stressed_count)
-            df.loc[idx, 'Stressed_Neighbors'] = stressed_count
-            
-            # Classify
-            if stressed_count >= min_neighbors:
-                df.loc[idx, 'Status'] = 'MERAH'
-            elif stressed_count >= 1:
-                df.loc[idx, 'Status'] = 'ORANYE'
-            else:
-                df.loc[idx, 'Status'] = 'KUNING'
+            total = -1
+            for db in range(-1, 2):
+                row = cell[i] + db * width[i]
+                for dp in range(-1, 2):
+                    total += grid[row + dp]
+            counts[i] = max(total, 0)
+        return counts
+
+def classify_zscores(prepared, z_core=-1.5, z_neighbor=-0.5, min_neighbors=1):
+    """Klasifikasi Status dari hasil prepare_zscores untuk satu set threshold."""
+    df = prepared['df'].copy()
+    cell, width = prepared['cell'], prepared['width']
+    zscore = df['ZScore'].to_numpy()
+    
+    is_core = zscore < z_core
+    df['Is_Core'] = is_core
+    
+    if HAS_NUMBA:
+        stressed_count = count_stressed_neighbors(cell, width, zscore, z_core, z_neighbor, prepared['n_cells'])
+    else:
+        # Jumlah pohon stres per sel (duplikat koordinat ikut terhitung), lalu jumlah jendela 3x3
+        stressed_grid = np.bincount(cell[zscore < z_neighbor], minlength=prepared['n_cells'])
+        window_counts = np.zeros(len(df), dtype=np.int64)
+        for db, dp in WINDOW_OFFSETS:
+            window_counts += stressed_grid[cell + db * width + dp]
+        
+        # Exclude self (minimal 0); hanya pohon core yang dihitung, non-core tetap 0
+        stressed_count = np.where(is_core, np.maximum(window_counts - 1, 0), 0)
+    df['Stressed_Neighbors'] = stressed_count
+    
+    # Classify - kode status integer sekali jalan, kolom Status sebagai Categorical
+    status_codes = np.select(
+        [~is_core, stressed_count >= min_neighbors, stressed_count >= 1],
+        [0, 3, 2],
+        1
+    )
+    df['Status'] = pd.Categorical.from_codes(status_codes, categories=STATUS_CATEGORIES)
     
     return df
 
-def generate_cluster_map_png(df, blok, preset_name, rank, output_dir, divisi_id):
-    """Generate matplotlib cluster map PNG for a block - VERTICAL format with hexagonal offset."""
+def calculate_zscore_detection(df, z_core=-1.5, z_neighbor=-0.5, min_neighbors=1):
+    """
+    Calculate Z-Score based Ganoderma detection.
+    Returns DataFrame with Status column.
+    """
+    return classify_zscores(prepare_zscores(df), z_core, z_neighbor, min_neighbors)
+
+# Gaya marker peta per kode Status (urutan STATUS_CATEGORIES: HIJAU, KUNING, ORANYE, MERAH)
+MAP_FACE_COLORS = np.array(['#27ae60', '#f1c40f', '#e67e22', '#e74c3c'])
+MAP_EDGE_COLORS = np.array(['darkgreen', 'olive', 'darkorange', 'darkred'])
+MAP_EDGE_WIDTHS = np.array([0.5, 1, 1, 1])
+MAP_SIZES = np.array([60, 60, 60, 60])
+
+# Figure peta dipakai ulang per proses (alokasi Figure/canvas hanya sekali per worker)
+_CLUSTER_FIG = None
+
+def get_cluster_figure():
+    """Return (fig, ax) peta kluster milik proses ini, dengan axes yang sudah dikosongkan."""
+    global _CLUSTER_FIG
+    if _CLUSTER_FIG is None:
+        _CLUSTER_FIG = plt.subplots(figsize=(14, 12))
+    else:
+        fig, ax = _CLUSTER_FIG
+        ax.cla()
+        # Reset margin ke default agar tight_layout mulai dari kondisi yang sama seperti figure baru
+        fig.subplots_adjust(**{k: plt.rcParams[f'figure.subplot.{k}']
+                               for k in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    return _CLUSTER_FIG
+
+def generate_cluster_map_png(df, blok, preset_name, rank, output_dir, divisi_id, return_image=False):
+    """
+    Generate matplotlib cluster map image (WebP) for a block - VERTICAL format with hexagonal offset.
+    return_image: bytes gambar dikembalikan di key 'image' (tidak ditulis ke disk) - dipakai worker
+    render agar penulisan file dilakukan thread I/O di proses utama.
+    """
     import matplotlib.patches as mpatches
     
     block_df = df[df['Blok'] == blok].copy().reset_index(drop=True)
     if len(block_df) == 0:
         return None
     
-    # Count statistics
-    merah_count = (block_df['Status'] == 'MERAH').sum()
-    oranye_count = (block_df['Status'] == 'ORANYE').sum()
-    kuning_count = (block_df['Status'] == 'KUNING').sum()
-    hijau_count = (block_df['Status'] == 'HIJAU').sum()
+    # Count statistics - satu bincount atas kode kategori Status (urutan STATUS_CATEGORIES)
+    codes = block_df['Status'].cat.codes.to_numpy()
+    hijau_count, kuning_count, oranye_count, merah_count = np.bincount(codes, minlength=len(STATUS_CATEGORIES))
     total_count = len(block_df)
     
     # Create figure - VERTICAL/PORTRAIT format like dashboard lama
-    fig, ax = plt.subplots(figsize=(14, 12))
-    
-    # Prepare colors, sizes, edge colors based on status
-    colors = []
-    sizes = []
-    edge_colors = []
-    edge_widths = []
+    fig, ax = get_cluster_figure()
     
-    for _, row in block_df.iterrows():
-        status = row['Status']
-        if status == 'MERAH':
-            colors.append('#e74c3c')
-            sizes.append(60)
-            edge_colors.append('darkred')
-            edge_widths.append(1)
-        elif status == 'ORANYE':
-            colors.append('#e67e22')
-            sizes.append(60)
-            edge_colors.append('darkorange')
-            edge_widths.append(1)
-        elif status == 'KUNING':
-            colors.append('#f1c40f')
-            sizes.append(60)
-            edge_colors.append('olive')
-            edge_widths.append(1)
-        else:  # HIJAU
-            colors.append('#27ae60')
-            sizes.append(60)
-            edge_colors.append('darkgreen')
-            edge_widths.append(0.5)
+    # Colors, sizes, edge colors per status - lookup vektor dari kode kategori Status
+    colors = MAP_FACE_COLORS[codes]
+    sizes = MAP_SIZES[codes]
+    edge_colors = MAP_EDGE_COLORS[codes]
+    edge_widths = MAP_EDGE_WIDTHS[codes]
     
-    # Apply hexagonal offset (like dashboard lama)
-    x_coords = []
-    y_coords = []
-    for _, row in block_df.iterrows():
-        baris = row['N_BARIS']
-        pokok = row['N_POKOK']
-        x_offset = 0.5 if baris % 2 == 0 else 0
-        x_coords.append(pokok + x_offset)
-        y_coords.append(baris)
+    # Apply hexagonal offset (like dashboard lama) - baris genap digeser 0.5
+    y_coords = block_df['N_BARIS'].to_numpy()
+    x_coords = block_df['N_POKOK'].to_numpy() + np.where(y_coords % 2 == 0, 0.5, 0.0)
     
-    # Plot in layers (HIJAU first, MERAH last so MERAH is on top)
-    status_order = ['HIJAU', 'KUNING', 'ORANYE', 'MERAH']
-    
-    for status in status_order:
-        mask = block_df['Status'] == status
-        if mask.any():
-            indices = block_df[mask].index.tolist()
-            x_plot = [x_coords[i] for i in indices]
-            y_plot = [y_coords[i] for i in indices]
-            s_plot = [sizes[i] for i in indices]
-            c_plot = [colors[i] for i in indices]
-            ec_plot = [edge_colors[i] for i in indices]
-            ew_plot = [edge_widths[i] for i in indices]
-            
-            ax.scatter(x_plot, y_plot, c=c_plot, s=s_plot, alpha=0.85,
-                      edgecolors=ec_plot, linewidths=ew_plot, zorder=status_order.index(status)+1)
+    # Satu scatter; urut stabil per kode (HIJAU -> MERAH) sehingga MERAH tetap digambar paling atas
+    order = np.argsort(codes, kind='stable')
+    ax.scatter(x_coords[order], y_coords[order], c=colors[order], s=sizes[order],
+              alpha=0.85, edgecolors=edge_colors[order], linewidths=edge_widths[order], rasterized=True, zorder=1)
     
     # Legend with proper labels
     legend_elements = [
@@ -242,20 +296,17 @@ def generate_cluster_map_png(df, blok, preset_name, rank, output_dir, divisi_id)
            bbox=dict(boxstyle='round,pad=0.3', facecolor=preset_colors.get(preset_name, '#333'),
                     edgecolor='black', linewidth=1))
     
-    plt.tight_layout()
+    fig.tight_layout()
     
-    # Save with higher DPI
-    divisi_dir = output_dir / divisi_id
-    divisi_dir.mkdir(exist_ok=True)
-    
-    filename = f'cluster_map_{preset_name}_{rank:02d}_{blok}.png'
-    filepath = divisi_dir / filename
-    fig.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close(fig)
+    # Save - DPI tinggi hanya untuk top 3; rank 4-5 cukup resolusi thumbnail
+    # WebP (libwebp via Pillow): file ~3x lebih kecil dari PNG untuk scatter raster
+    filename = f'cluster_map_{preset_name}_{rank:02d}_{blok}.webp'
+    dpi = 150 if rank <= 3 else 90
+    buf = io.BytesIO()
+    fig.savefig(buf, format='webp', dpi=dpi, bbox_inches='tight', facecolor='white',
+                pil_kwargs={'quality': 85, 'method': 4})
     
-    logging.info(f"  Saved: {filename}")
-    
-    return {
+    result = {
         'filename': filename,
         'blok': blok,
         'rank': rank,
@@ -265,12 +316,31 @@ def generate_cluster_map_png(df, blok, preset_name, rank, output_dir, divisi_id)
         'hijau': hijau_count,
         'total': total_count
     }
+    if return_image:
+        result['image'] = buf.getvalue()
+    else:
+        divisi_dir = output_dir / divisi_id
+        divisi_dir.mkdir(exist_ok=True)
+        (divisi_dir / filename).write_bytes(buf.getvalue())
+        logging.info(f"  Saved: {filename}")
+    return result
 
-def analyze_divisi_with_zscore(df, divisi_name, output_dir, presets=['konservatif', 'standar', 'agresif']):
-    """Analyze a division with Z-Score for all presets."""
+def analyze_divisi_with_zscore(df, divisi_name, output_dir, presets=['konservatif', 'standar', 'agresif'], pool=None):
+    """
+    Analyze a division with Z-Score for all presets.
+    pool: ProcessPoolExecutor bersama untuk render peta; dibuat sementara jika None.
+    """
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as own_pool:
+            return analyze_divisi_with_zscore(df, divisi_name, output_dir, presets, pool=own_pool)
+    
     divisi_id = divisi_name.replace(' ', '_')
     results = {}
     block_maps = {}
+    map_futures = {}
+    
+    # Z-Score dan grid blok tidak bergantung preset - hitung sekali untuk ketiga preset
+    prepared = prepare_zscores(df)
     
     for preset_name in presets:
         preset = ZSCORE_PRESETS[preset_name]
@@ -278,40 +348,35 @@ def analyze_divisi_with_zscore(df, divisi_name, output_dir, presets=['konservati
         logging.info(f"Analyzing {divisi_name} with {preset_name} preset...")
         
         # Run Z-Score detection
-        df_classified = calculate_zscore_detection(
-            df,
+        df_classified = classify_zscores(
+            prepared,
             z_core=preset['z_threshold_core'],
             z_neighbor=preset['z_threshold_neighbor'],
             min_neighbors=preset['min_stressed_neighbors']
         )
         
         # Calculate statistics
-        merah_count = (df_classified['Status'] == 'MERAH').sum()
-        oranye_count = (df_classified['Status'] == 'ORANYE').sum()
-        kuning_count = (df_classified['Status'] == 'KUNING').sum()
-        hijau_count = (df_classified['Status'] == 'HIJAU').sum()
+        hijau_count, kuning_count, oranye_count, merah_count = np.bincount(
+            df_classified['Status'].cat.codes, minlength=len(STATUS_CATEGORIES))
         total_trees = len(df_classified)
         
         # Find top 5 blocks by risk
-        block_risk = df_classified.groupby('Blok').agg({
-            'Status': lambda x: ((x == 'MERAH') | (x == 'ORANYE')).sum()
-        }).reset_index()
-        block_risk.columns = ['Blok', 'Risk_Count']
-        block_risk['Total'] = df_classified.groupby('Blok').size().values
+        # (mask risiko sekali untuk seluruh kolom, lalu sum/size per blok via kernel Cython;
+        # satu groupby, urutan blok = urutan kemunculan)
+        is_risk = df_classified['Status'].isin(['MERAH', 'ORANYE'])
+        block_risk = is_risk.groupby(df_classified['Blok'], sort=False, observed=True).agg(
+            Risk_Count='sum', Total='size'
+        ).reset_index()
         block_risk['Risk_Pct'] = block_risk['Risk_Count'] / block_risk['Total'] * 100
         top_blocks = block_risk.nlargest(5, 'Risk_Pct')
         
-        # Generate cluster maps for top 5 blocks
-        maps = []
-        for rank, (_, row) in enumerate(top_blocks.iterrows(), 1):
-            blok = row['Blok']
-            map_info = generate_cluster_map_png(
-                df_classified, blok, preset_name, rank, output_dir, divisi_id
-            )
-            if map_info:
-                maps.append(map_info)
-        
-        block_maps[preset_name] = maps
+        # Generate cluster maps for top 5 blocks - dirender paralel di pool
+        # (independen per blok; hanya baris blok terkait yang dikirim ke worker)
+        map_futures[preset_name] = [
+            pool.submit(generate_cluster_map_png, df_classified[df_classified['Blok'] == blok],
+                        blok, preset_name, rank, output_dir, divisi_id, return_image=True)
+            for rank, blok in enumerate(top_blocks['Blok'], 1)
+        ]
         
         results[preset_name] = {
             'df': df_classified,
@@ -331,37 +396,91 @@ def analyze_divisi_with_zscore(df, divisi_name, output_dir, presets=['konservati
         
         logging.info(f"  {preset_name}: MERAH={merah_count}, ORANYE={oranye_count}")
     
+    # Gambar ditulis thread I/O sehingga flush disk tumpang tindih dengan hasil render berikutnya
+    divisi_dir = output_dir / divisi_id
+    divisi_dir.mkdir(exist_ok=True)
+    with ThreadPoolExecutor(max_workers=4) as io_pool:
+        writes = []
+        for preset_name, futures in map_futures.items():
+            block_maps[preset_name] = [m for m in (f.result() for f in futures) if m]
+            for m in block_maps[preset_name]:
+                writes.append(io_pool.submit((divisi_dir / m['filename']).write_bytes, m.pop('image')))
+                logging.info(f"  Saved: {m['filename']}")
+        for w in writes:
+            w.result()
+    
     return results, block_maps
 
+# Tipe kolom pohon di payload JS (little-endian) -> typed array yang sama di recalculateDivisi
+JS_TREE_DTYPES = {'blok': '<u2', 'baris': '<i2', 'pokok': '<i2', 'zscore': '<f4'}
+
+def pack_column_b64(values, dtype):
+    """
+    Pack kolom numerik ke bytes biner base64 untuk didecode langsung sebagai typed array di browser.
+    Dtype integer dicek rentangnya dulu: nilai di luar rentang -> ValueError, bukan wrap diam-diam.
+    """
+    values = np.asarray(values)
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'iu' and values.size:
+        info = np.iinfo(dtype)
+        lo, hi = values.min(), values.max()
+        if lo < info.min or hi > info.max:
+            raise ValueError(f"Column range [{lo}, {hi}] does not fit {dtype} [{info.min}, {info.max}]")
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
 def prepare_tree_data_for_js(df, max_trees=25000):
-    """Prepare tree data as JSON for JavaScript real-time processing."""
+    """
+    Prepare tree data for JavaScript real-time processing.
+    Z-Score dihitung di sini (Mean/SD blok dari seluruh pohon) lalu dikirim sebagai kolom typed
+    array base64 (JS_TREE_DTYPES); 'blok' adalah indeks blok 0..n_blocks-1.
+    Returns (trees, n_blocks) - JS hanya butuh jumlah blok, bukan Mean/SD per blok.
+    """
     cols = ['Blok', 'N_BARIS', 'N_POKOK', 'NDRE125']
-    df_subset = df[cols].copy()
-    df_subset['N_BARIS'] = df_subset['N_BARIS'].astype(int)
-    df_subset['N_POKOK'] = df_subset['N_POKOK'].astype(int)
+    # NDRE125 bisa tersimpan float32 (load_ame_iv_data); statistik blok tetap dari float64
+    df_trees = df[cols].astype({'N_BARIS': int, 'N_POKOK': int, 'NDRE125': np.float64})
     
-    # Sample if too large
-    if len(df_subset) > max_trees:
-        sample_rate = len(df_subset) // max_trees
-        df_subset = df_subset.iloc[::sample_rate]
+    # Sample if too large - acak seragam (seed tetap agar output reproducible), indeks diurutkan
+    # supaya urutan pohon tetap per blok/baris seperti data asli
+    rows = slice(None)
+    if len(df_trees) > max_trees:
+        rows = np.sort(np.random.default_rng(0).choice(len(df_trees), size=max_trees, replace=False))
+    df_subset = df_trees.iloc[rows]
     
-    # Block statistics
-    block_stats = df[cols].groupby('Blok').agg({
-        'NDRE125': ['mean', 'std', 'count']
-    }).reset_index()
-    block_stats.columns = ['Blok', 'Mean_NDRE', 'SD_NDRE', 'Count']
-    block_stats['SD_NDRE'] = block_stats['SD_NDRE'].fillna(1).replace(0, 1)
+    # Block statistics - dua reduksi langsung, tanpa kolom MultiIndex + reset_index + flatten
+    ndre_by_blok = df_trees.groupby('Blok', sort=False, observed=True)['NDRE125']
+    mean = ndre_by_blok.mean()
+    sd = ndre_by_blok.std().fillna(1).replace(0, 1)
     
-    return df_subset.to_dict('records'), block_stats.to_dict('records')
+    # Z-Score per pohon sampel dari Mean/SD bloknya (sekali di sini, bukan tiap recalculation di JS)
+    blok_id = mean.index.get_indexer(df_subset['Blok'])
+    zscore = (df_subset['NDRE125'].to_numpy() - mean.to_numpy()[blok_id]) / sd.to_numpy()[blok_id]
+    
+    # Pohon sebagai kolom paralel (SoA) dalam bytes biner, bukan list JSON per atribut
+    columns = {
+        'blok': blok_id,
+        'baris': df_subset['N_BARIS'].to_numpy(),
+        'pokok': df_subset['N_POKOK'].to_numpy(),
+        'zscore': zscore
+    }
+    trees = {name: pack_column_b64(values, JS_TREE_DTYPES[name]) for name, values in columns.items()}
+    
+    return trees, len(mean)
+
+# Tampilan kartu/galeri per preset (urutan = urutan tampil), dibangun sekali di level modul
+PRESET_DISPLAY = {
+    'konservatif': {'color': '#3498db', 'icon': '🔵', 'display': 'Konservatif'},
+    'standar': {'color': '#27ae60', 'icon': '🟢', 'display': 'Standar'},
+    'agresif': {'color': '#e74c3c', 'icon': '🔴', 'display': 'Agresif'}
+}
 
 def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, all_tree_data):
     """Generate HTML dashboard with tabs for AME II and AME IV."""
     
     presets_json = json.dumps(ZSCORE_PRESETS)
     
-    # Build tabs HTML
-    divisi_tabs_html = ""
-    divisi_content_html = ""
+    # Build tabs HTML - potongan dikumpulkan di list lalu di-join sekali (bukan += string)
+    divisi_tabs = []
+    divisi_contents = []
     
     for idx, (divisi_name, data) in enumerate(all_divisi_results.items()):
         divisi_id = divisi_name.replace(' ', '_')
@@ -370,31 +489,26 @@ def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, a
         results = data['results']
         block_maps = all_block_maps[divisi_name]
         tree_data = all_tree_data[divisi_name]['trees']
-        block_stats = all_tree_data[divisi_name]['stats']
+        n_blocks = all_tree_data[divisi_name]['n_blocks']
         
         # Tab button - using style from user's image
         tab_color = "#e67e22" if idx == 0 else "#3498db"
-        divisi_tabs_html += f'''
+        divisi_tabs.append(f'''
             <button class="divisi-tab {active_class}" style="background: {tab_color};" 
                     onclick="switchDivisi('{divisi_id}')" data-divisi="{divisi_id}">
                 🌴 {divisi_name}
             </button>
-        '''
+        ''')
         
         # Stats from standar preset
         stats = results['standar']['metadata']
         
         # Build preset cards
-        preset_cards = ""
-        for preset_name in ['konservatif', 'standar', 'agresif']:
+        preset_cards = []
+        for preset_name, preset_info in PRESET_DISPLAY.items():
             meta = results[preset_name]['metadata']
-            preset_info = {
-                'konservatif': {'color': '#3498db', 'icon': '🔵', 'display': 'Konservatif'},
-                'standar': {'color': '#27ae60', 'icon': '🟢', 'display': 'Standar'},
-                'agresif': {'color': '#e74c3c', 'icon': '🔴', 'display': 'Agresif'}
-            }[preset_name]
             
-            preset_cards += f'''
+            preset_cards.append(f'''
             <div class="preset-card" data-preset="{preset_name}">
                 <div class="preset-header" style="background: linear-gradient(135deg, {preset_info['color']}, {preset_info['color']}dd);">
                     <span class="preset-icon">{preset_info['icon']}</span>
@@ -422,47 +536,40 @@ def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, a
                     </div>
                 </div>
             </div>
-            '''
+            ''')
         
         # Build block maps gallery
-        block_maps_html = ""
-        for preset_name in ['konservatif', 'standar', 'agresif']:
-            preset_info = {
-                'konservatif': {'color': '#3498db', 'icon': '🔵', 'display': 'Konservatif'},
-                'standar': {'color': '#27ae60', 'icon': '🟢', 'display': 'Standar'},
-                'agresif': {'color': '#e74c3c', 'icon': '🔴', 'display': 'Agresif'}
-            }[preset_name]
-            
+        block_maps_sections = []
+        for preset_name, preset_info in PRESET_DISPLAY.items():
             maps = block_maps.get(preset_name, [])
-            maps_items = ""
+            maps_items = []
             for m in maps:
-                maps_items += f'''
+                maps_items.append(f'''
                     <div class="map-item" onclick="openLightbox('{divisi_id}/{m['filename']}', 'Blok {m['blok']}')">
                         <img src="{divisi_id}/{m['filename']}" alt="Cluster Map {m['blok']}">
                         <div class="map-label">{m['blok']} - 🔴{m['merah']} 🟠{m['oranye']}</div>
                     </div>
-                '''
+                ''')
             
-            block_maps_html += f'''
+            block_maps_sections.append(f'''
             <div class="maps-preset-section">
                 <h4 style="color: {preset_info['color']}">{preset_info['icon']} {preset_info['display']}</h4>
                 <div class="maps-grid">
-                    {maps_items}
+                    {''.join(maps_items)}
                 </div>
             </div>
-            '''
+            ''')
         
         # Store tree data for JavaScript
         tree_data_json = json.dumps(tree_data)
-        block_stats_json = json.dumps(block_stats)
         
         # Divisi content
-        divisi_content_html += f'''
+        divisi_contents.append(f'''
         <div class="divisi-content {active_class}" id="content-{divisi_id}" data-divisi="{divisi_id}">
             <script>
                 divisiData['{divisi_id}'] = {{
                     trees: {tree_data_json},
-                    stats: {block_stats_json},
+                    blockCount: {n_blocks},
                     totalTrees: {stats['total_trees']}
                 }};
             </script>
@@ -498,7 +605,7 @@ def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, a
             <section class="preset-cards-section">
                 <h3>📊 Perbandingan 3 Preset (Z-Score)</h3>
                 <div class="preset-cards-container">
-                    {preset_cards}
+                    {''.join(preset_cards)}
                 </div>
             </section>
             
@@ -518,10 +625,10 @@ def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, a
             
             <section class="block-maps-section">
                 <h3>🗺️ Peta Kluster per Blok (Top 5)</h3>
-                {block_maps_html}
+                {''.join(block_maps_sections)}
             </section>
         </div>
-        '''
+        ''')
     
     # Full HTML
     html = f'''<!DOCTYPE html>
@@ -1141,7 +1248,7 @@ def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, a
         
         <!-- Divisi Tabs -->
         <div class="divisi-tabs">
-            {divisi_tabs_html}
+            {''.join(divisi_tabs)}
         </div>
         
         <!-- Divisi Content -->
@@ -1151,7 +1258,7 @@ def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, a
             const charts = {{}};
         </script>
         
-        {divisi_content_html}
+        {''.join(divisi_contents)}
         
         <div class="footer">
             <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
@@ -1209,49 +1316,70 @@ def generate_multi_divisi_html(output_dir, all_divisi_results, all_block_maps, a
             }}, 100);
         }}
         
-        function getBlockStat(divisiId, blok) {{
-            const stats = divisiData[divisiId].stats;
-            return stats.find(s => s.Blok === blok) || {{ Mean_NDRE: 0, SD_NDRE: 1 }};
+        function decodeColumn(b64, ArrayType) {{
+            const bin = atob(b64);
+            const bytes = new Uint8Array(bin.length);
+            for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+            return new ArrayType(bytes.buffer);
+        }}
+        
+        // Kolom pohon (typed array) per divisi, didecode sekali dari payload base64
+        function getTreeColumns(divisiId) {{
+            const data = divisiData[divisiId];
+            if (!data.columns) {{
+                data.columns = {{
+                    blok: decodeColumn(data.trees.blok, Uint16Array),
+                    baris: decodeColumn(data.trees.baris, Int16Array),
+                    pokok: decodeColumn(data.trees.pokok, Int16Array),
+                    zscore: decodeColumn(data.trees.zscore, Float32Array)
+                }};
+            }}
+            return data.columns;
         }}
         
+        // Key sel grid = baris * CELL_KEY_STRIDE + pokok (nomor pokok jauh di bawah stride)
+        const CELL_KEY_STRIDE = 65536;
+        
         function recalculateDivisi(divisiId, zCore, zNeighbor, minNeighbors) {{
-            const trees = divisiData[divisiId].trees;
+            const trees = getTreeColumns(divisiId);
+            const zscore = trees.zscore;
+            const n = zscore.length;
             let merah = 0, oranye = 0, kuning = 0, hijau = 0;
             
-            // Group by block
-            const byBlock = {{}};
-            trees.forEach(tree => {{
-                if (!byBlock[tree.Blok]) byBlock[tree.Blok] = [];
-                byBlock[tree.Blok].push(tree);
-            }});
+            // Group by block (indeks pohon per blok; blok = indeks 0..blockCount-1)
+            const byBlock = Array.from({{length: divisiData[divisiId].blockCount}}, () => []);
+            for (let i = 0; i < n; i++) {{
+                byBlock[trees.blok[i]].push(i);
+            }}
             
-            // Process each block
-            Object.keys(byBlock).forEach(blok => {{
-                const blockTrees = byBlock[blok];
-                const stat = getBlockStat(divisiId, blok);
-                
-                // Calculate Z-scores
-                blockTrees.forEach(tree => {{
-                    tree.ZScore = stat.SD_NDRE > 0 ? (tree.NDRE125 - stat.Mean_NDRE) / stat.SD_NDRE : 0;
-                    tree.isCore = tree.ZScore < zCore;
+            // Count neighbors and classify - hash grid per blok: key sel (baris, pokok) -> jumlah pohon
+            // stres di sel itu (duplikat koordinat ikut dihitung); tiap core cukup probe 9 sel
+            byBlock.forEach(blockTrees => {{
+                const stressedGrid = new Map();
+                blockTrees.forEach(i => {{
+                    if (zscore[i] < zNeighbor) {{
+                        const key = trees.baris[i] * CELL_KEY_STRIDE + trees.pokok[i];
+                        stressedGrid.set(key, (stressedGrid.get(key) || 0) + 1);
+                    }}
                 }});
                 
-                // Count neighbors and classify
-                blockTrees.forEach((tree, idx) => {{
-                    if (!tree.isCore) {{
+                blockTrees.forEach(i => {{
+                    if (!(zscore[i] < zCore)) {{
                         hijau++;
                         return;
                     }}
                     
-                    let stressedNeighbors = 0;
-                    blockTrees.forEach((other, oIdx) => {{
-                        if (idx === oIdx) return;
-                        if (Math.abs(other.N_BARIS - tree.N_BARIS) <= 1 &&
-                            Math.abs(other.N_POKOK - tree.N_POKOK) <= 1 &&
-                            other.ZScore < zNeighbor) {{
-                            stressedNeighbors++;
+                    // Pohon itu sendiri tidak dihitung sebagai tetangga
+                    let stressedNeighbors = zscore[i] < zNeighbor ? -1 : 0;
+                    const key = trees.baris[i] * CELL_KEY_STRIDE + trees.pokok[i];
+                    probe:
+                    for (let db = -1; db <= 1; db++) {{
+                        for (let dp = -1; dp <= 1; dp++) {{
+                            stressedNeighbors += stressedGrid.get(key + db * CELL_KEY_STRIDE + dp) || 0;
+                            // Status sudah pasti MERAH - sisa sel tidak perlu diperiksa
+                            if (stressedNeighbors >= minNeighbors) break probe;
                         }}
-                    }});
+                    }}
                     
                     if (stressedNeighbors >= minNeighbors) {{
                         merah++;
@@ -1409,21 +1537,23 @@ def main():
     all_block_maps = {}
     all_tree_data = {}
     
-    print('\n[3/5] Analyzing AME II with Z-Score...')
-    results_ii, maps_ii = analyze_divisi_with_zscore(df_ame_ii, 'AME II', output_dir)
-    all_divisi_results['AME II'] = {'results': results_ii}
-    all_block_maps['AME II'] = maps_ii
-    
-    trees_ii, stats_ii = prepare_tree_data_for_js(df_ame_ii)
-    all_tree_data['AME II'] = {'trees': trees_ii, 'stats': stats_ii}
-    
-    print('\n[4/5] Analyzing AME IV with Z-Score...')
-    results_iv, maps_iv = analyze_divisi_with_zscore(df_ame_iv, 'AME IV', output_dir)
-    all_divisi_results['AME IV'] = {'results': results_iv}
-    all_block_maps['AME IV'] = maps_iv
-    
-    trees_iv, stats_iv = prepare_tree_data_for_js(df_ame_iv)
-    all_tree_data['AME IV'] = {'trees': trees_iv, 'stats': stats_iv}
+    # Satu process pool untuk render peta kedua divisi
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        print('\n[3/5] Analyzing AME II with Z-Score...')
+        results_ii, maps_ii = analyze_divisi_with_zscore(df_ame_ii, 'AME II', output_dir, pool=pool)
+        all_divisi_results['AME II'] = {'results': results_ii}
+        all_block_maps['AME II'] = maps_ii
+        
+        trees_ii, n_blocks_ii = prepare_tree_data_for_js(df_ame_ii)
+        all_tree_data['AME II'] = {'trees': trees_ii, 'n_blocks': n_blocks_ii}
+        
+        print('\n[4/5] Analyzing AME IV with Z-Score...')
+        results_iv, maps_iv = analyze_divisi_with_zscore(df_ame_iv, 'AME IV', output_dir, pool=pool)
+        all_divisi_results['AME IV'] = {'results': results_iv}
+        all_block_maps['AME IV'] = maps_iv
+        
+        trees_iv, n_blocks_iv = prepare_tree_data_for_js(df_ame_iv)
+        all_tree_data['AME IV'] = {'trees': trees_iv, 'n_blocks': n_blocks_iv}
     
     # Generate HTML dashboard
     print('\n[5/5] Generating Multi-Divisi HTML Dashboard...')
@@ -1436,7 +1566,7 @@ def main():
     print(f'🌐 Dashboard: {html_path}')
     print(f'\n💡 Fitur:')
     print('   - Tab AME II dan AME IV')
-    print('   - Peta kluster matplotlib (PNG) per blok')
+    print('   - Peta kluster matplotlib (WebP) per blok')
     print('   - Real-time recalculation dengan Z-Score')
     print('   - Konfigurasi preset interaktif')
     